@@ -17,7 +17,9 @@ Based on the code of https://gitlab.geant.org/edugain/edugain-contacts
 
 import argparse
 import sys
-from xml.etree import ElementTree as ET
+from collections.abc import Iterable
+
+from lxml import etree
 
 from ..core import (
     get_federation_mapping as core_get_federation_mapping,
@@ -124,7 +126,9 @@ def categorize_error(
         return f"Unexpected Status {status_code}"
 
 
-def collect_entity_privacy_urls(root: ET.Element) -> list[tuple[str, str, str, str]]:
+def collect_entity_privacy_urls(
+    root: etree._Element | Iterable[etree._Element],
+) -> list[tuple[str, str, str, str]]:
     """
     Collect all entities (SPs and IdPs) with privacy statement URLs.
 
@@ -165,7 +169,8 @@ def validate_privacy_urls(
     Returns:
         Dict mapping URL -> validation_result
     """
-    unique_urls = list({url for _, _, _, url in entity_data})
+    # Deduplicate in metadata order so every run validates URLs in the same order
+    unique_urls = list(dict.fromkeys(url for _, _, _, url in entity_data))
     if not unique_urls:
         return {}
 
@@ -288,13 +293,13 @@ def main() -> None:
 
     args = parser.parse_args()
 
-    def rows_factory(root: ET.Element) -> list[list[str]]:
+    def rows_factory(entities: Iterable[etree._Element]) -> list[list[str]]:
         print("Fetching federation name mapping...", file=sys.stderr)
         federation_mapping = get_federation_mapping()
         print(f"Loaded {len(federation_mapping)} federation names", file=sys.stderr)
 
         print("Collecting entities with privacy statement URLs...", file=sys.stderr)
-        entity_data = collect_entity_privacy_urls(root)
+        entity_data = collect_entity_privacy_urls(entities)
         print(
             f"Found {len(entity_data)} entities with privacy statement URLs",
             file=sys.stderr,
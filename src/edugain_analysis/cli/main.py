@@ -8,6 +8,7 @@ various output formats including summaries, reports, and CSV exports.
 import argparse
 import csv
 import sys
+from operator import itemgetter
 
 from ..config import EDUGAIN_METADATA_URL, URL_VALIDATION_THREADS
 from ..core import (
@@ -16,10 +17,11 @@ from ..core import (
     filter_entities,
     get_federation_mapping,
     get_metadata,
+    iter_entities,
     load_url_validation_cache,
-    parse_metadata,
     sanitize_csv_value,
     save_url_validation_cache,
+    stream_entities,
     validate_url_for_ssrf,
 )
 from ..formatters import (
@@ -29,6 +31,7 @@ from ..formatters import (
     print_summary_markdown,
 )
 from .pdf import handle_pdf_output
+from .utils import buffered_stdout
 
 
 def setup_argument_parser() -> argparse.ArgumentParser:
@@ -178,64 +181,71 @@ def handle_csv_export(args, entities_list, stats, federation_stats):
             v = d.get(key)
             return "" if v is None else str(v)
 
-        writer = csv.writer(sys.stdout)
-        if not args.no_headers:
-            writer.writerow(headers)
-        for e in entities_list:
-            if e[4] != "Yes":
-                continue
-            cresult = stats.get("content_results", {}).get(e[5], {})
-            row = [
-                sanitize_csv_value(str(e[0])),
-                sanitize_csv_value(str(e[3])),
-                sanitize_csv_value(str(e[5])),
-                sanitize_csv_value(_cv(cresult, "status_code")),
-                sanitize_csv_value(_cv(cresult, "content_quality_score")),
-                sanitize_csv_value(_cv(cresult, "https_enabled")),
-                sanitize_csv_value(_cv(cresult, "content_length")),
-                sanitize_csv_value(_cv(cresult, "has_gdpr_keywords")),
-                sanitize_csv_value(_cv(cresult, "keyword_count")),
-                sanitize_csv_value(_cv(cresult, "is_soft_404")),
-                sanitize_csv_value(_cv(cresult, "detected_language")),
-                sanitize_csv_value(_cv(cresult, "response_time_ms")),
-                sanitize_csv_value("|".join(cresult.get("quality_issues") or [])),
-            ]
-            writer.writerow(row)
+        # Federation, EntityID, HasPrivacyStatement, PrivacyStatementURL
+        content_columns = itemgetter(0, 3, 4, 5)
+        content_results = stats.get("content_results", {})
+
+        with buffered_stdout() as output:
+            writer = csv.writer(output)
+            if not args.no_headers:
+                writer.writerow(headers)
+            for e in entities_list:
+                federation, entity_id, has_privacy, privacy_url = content_columns(e)
+                if has_privacy != "Yes":
+                    continue
+                cresult = content_results.get(privacy_url, {})
+                row = [
+                    sanitize_csv_value(str(federation)),
+                    sanitize_csv_value(str(entity_id)),
+                    sanitize_csv_value(str(privacy_url)),
+                    sanitize_csv_value(_cv(cresult, "status_code")),
+                    sanitize_csv_value(_cv(cresult, "content_quality_score")),
+                    sanitize_csv_value(_cv(cresult, "https_enabled")),
+                    sanitize_csv_value(_cv(cresult, "content_length")),
+                    sanitize_csv_value(_cv(cresult, "has_gdpr_keywords")),
+                    sanitize_csv_value(_cv(cresult, "keyword_count")),
+                    sanitize_csv_value(_cv(cresult, "is_soft_404")),
+                    sanitize_csv_value(_cv(cresult, "detected_language")),
+                    sanitize_csv_value(_cv(cresult, "response_time_ms")),
+                    sanitize_csv_value("|".join(cresult.get("quality_issues") or [])),
+                ]
+                writer.writerow(row)
         return
 
     # Output entity CSV
-    writer = csv.writer(sys.stdout)
-    if not args.no_headers:
-        headers = [
-            "Federation",
-            "EntityType",
-            "OrganizationName",
-            "EntityID",
-            "HasPrivacyStatement",
-            "PrivacyStatementURL",
-            "HasSecurityContact",
-            "HasSIRTFI",
-        ]
-
-        # Add URL validation headers if validation was enabled
-        if stats.get("validation_enabled", False):
-            headers.extend(
-                [
-                    "URLStatusCode",
-                    "FinalURL",
-                    "URLAccessible",
-                    "RedirectCount",
-                    "ValidationError",
-                ]
-            )
+    headers = [
+        "Federation",
+        "EntityType",
+        "OrganizationName",
+        "EntityID",
+        "HasPrivacyStatement",
+        "PrivacyStatementURL",
+        "HasSecurityContact",
+        "HasSIRTFI",
+    ]
 
-        writer.writerow(headers)
+    # Add URL validation headers if validation was enabled
+    if stats.get("validation_enabled", False):
+        headers.extend(
+            [
+                "URLStatusCode",
+                "FinalURL",
+                "URLAccessible",
+                "RedirectCount",
+                "ValidationError",
+            ]
+        )
 
     # Sanitize all CSV values to prevent CSV injection attacks
     sanitized_entities = [
         [sanitize_csv_value(str(cell)) for cell in row] for row in entities_list
     ]
-    writer.writerows(sanitized_entities)
+
+    with buffered_stdout() as output:
+        writer = csv.writer(output)
+        if not args.no_headers:
+            writer.writerow(headers)
+        writer.writerows(sanitized_entities)
 
 
 def main() -> None:
@@ -273,14 +283,18 @@ def main() -> None:
                     print(f"Security Error: {e}", file=sys.stderr)
                     sys.exit(1)
 
-                xml_content = get_metadata(args.source)
-                root = parse_metadata(xml_content)
+                if args.source == EDUGAIN_METADATA_URL:
+                    # The default feed keeps its cache and conditional GET
+                    entities = iter_entities(get_metadata(EDUGAIN_METADATA_URL))
+                else:
+                    # Custom URLs are not cached: parse while downloading
+                    entities = stream_entities(args.source)
             else:
-                root = parse_metadata(None, args.source)
+                entities = iter_entities(None, args.source)
         else:
             # Use default eduGAIN metadata URL
             xml_content = get_metadata(EDUGAIN_METADATA_URL)
-            root = parse_metadata(xml_content)
+            entities = iter_entities(xml_content)
 
         # Get federation name mapping
         federation_mapping = get_federation_mapping()
@@ -306,7 +320,7 @@ def main() -> None:
 
         # Analyze entities
         entities_list, stats, federation_stats = analyze_privacy_security(
-            root,
+            entities,
             federation_mapping,
             enable_validation,
             validation_cache,
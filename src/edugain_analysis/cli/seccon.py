@@ -1,7 +1,9 @@
 import argparse
-from xml.etree import ElementTree as ET
+from collections.abc import Iterable
 
-from ..core.entities import iter_entity_records
+from lxml import etree
+
+from ..core.entities import has_security_contact, iter_entity_records
 from .utils import run_csv_cli
 
 EDUGAIN_METADATA_URL = "https://mds.edugain.org/edugain-v2.xml"
@@ -10,24 +12,28 @@ REQUEST_TIMEOUT = 30
 DESCRIPTION = "security contacts without SIRTFI certification"
 HEADERS = ["RegistrationAuthority", "EntityType", "OrganizationName", "EntityID"]
 
+# One CSV row per HEADERS entry; EntityType is None when no role descriptor exists
+EntityRow = tuple[str, str | None, str, str]
+
 
-def analyze_entities(root: ET.Element) -> list[list[str | None]]:
+def analyze_entities(
+    root: etree._Element | Iterable[etree._Element],
+) -> list[EntityRow]:
     """Analyze entities to find those with security contacts but no SIRTFI certification."""
-    entities_list: list[list[str | None]] = []
-    for record in iter_entity_records(root):
+    entities_list: list[EntityRow] = []
+    for record in iter_entity_records(root, prefilter=has_security_contact):
         if (
             record.registration_authority
             and record.has_security
             and not record.has_sirtfi
         ):
-            entity_type: str | None = record.entity_type if record.roles else None
             entities_list.append(
-                [
+                (
                     record.registration_authority,
-                    entity_type,
+                    record.entity_type if record.roles else None,
                     record.org_name,
                     record.entity_id,
-                ]
+                )
             )
 
     return entities_list
@@ -19,9 +19,11 @@ Based on the code of https://gitlab.geant.org/edugain/edugain-contacts
 """
 
 import argparse
-from xml.etree import ElementTree as ET
+from collections.abc import Iterable
 
-from ..core.entities import iter_entity_records
+from lxml import etree
+
+from ..core.entities import has_sirtfi, iter_entity_records
 from .utils import run_csv_cli
 
 EDUGAIN_METADATA_URL = "https://mds.edugain.org/edugain-v2.xml"
@@ -30,24 +32,28 @@ REQUEST_TIMEOUT = 30
 DESCRIPTION = "SIRTFI certifications without security contacts"
 HEADERS = ["RegistrationAuthority", "EntityType", "OrganizationName", "EntityID"]
 
+# One CSV row per HEADERS entry; EntityType is None when no role descriptor exists
+EntityRow = tuple[str, str | None, str, str]
+
 
-def analyze_entities(root: ET.Element) -> list[list[str | None]]:
+def analyze_entities(
+    root: etree._Element | Iterable[etree._Element],
+) -> list[EntityRow]:
     """Analyze entities to find those with SIRTFI certification but no security contacts."""
-    entities_list: list[list[str | None]] = []
-    for record in iter_entity_records(root):
+    entities_list: list[EntityRow] = []
+    for record in iter_entity_records(root, prefilter=has_sirtfi):
         if (
             record.registration_authority
             and record.has_sirtfi
             and not record.has_security
         ):
-            entity_type: str | None = record.entity_type if record.roles else None
             entities_list.append(
-                [
+                (
                     record.registration_authority,
-                    entity_type,
+                    record.entity_type if record.roles else None,
                     record.org_name,
                     record.entity_id,
-                ]
+                )
             )
 
     return entities_list
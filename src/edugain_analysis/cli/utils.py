@@ -9,11 +9,16 @@ domain-specific filtering.
 from __future__ import annotations
 
 import csv
+import io
 import sys
-from collections.abc import Callable, Iterable, Sequence
-from xml.etree import ElementTree as ET
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import TextIO
 
-from ..core import get_metadata, parse_metadata
+from lxml import etree
+
+from ..config import CSV_OUTPUT_BUFFER_SIZE, EDUGAIN_METADATA_URL
+from ..core import get_metadata, iter_entities, stream_entities
 
 CliRows = Iterable[Sequence[str | None]]
 
@@ -23,10 +28,16 @@ def load_metadata_for_cli(
     url: str | None,
     default_url: str,
     timeout: int,
-) -> ET.Element:
+) -> Iterator[etree._Element]:
     """
     Load metadata for CLI usage, honouring local file overrides.
 
+    The default eduGAIN feed is fetched through the metadata cache up front,
+    but parsed lazily: the returned iterator streams EntityDescriptor elements
+    via iter_entities(), so parse errors surface while the entities are
+    consumed. Other URLs are not cached and are streamed with
+    stream_entities(), so download errors surface at that point too.
+
     Args:
         local_file: Optional path to a local XML file.
         url: Optional remote URL override.
@@ -34,18 +45,50 @@ def load_metadata_for_cli(
         timeout: HTTP timeout when downloading.
 
     Returns:
-        Parsed ElementTree root element.
+        Iterator over EntityDescriptor elements.
     """
     if local_file:
-        return parse_metadata(None, local_file)
+        return iter_entities(None, local_file)
 
     target_url = url or default_url
+    if target_url != EDUGAIN_METADATA_URL:
+        # Only the default feed is cached; parse anything else while downloading
+        return stream_entities(target_url, timeout)
+
     xml_content = get_metadata(target_url, timeout)
-    return parse_metadata(xml_content)
+    return iter_entities(xml_content)
+
+
+@contextmanager
+def buffered_stdout() -> Iterator[TextIO]:
+    """
+    Yield a stream onto stdout with a large write buffer for bulk CSV output.
+
+    Rows are handed to the OS in CSV_OUTPUT_BUFFER_SIZE chunks instead of
+    per line. Streams without a file descriptor (e.g. StringIO in tests) are
+    yielded unchanged.
+    """
+    try:
+        fileno = sys.stdout.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        yield sys.stdout
+        return
+
+    sys.stdout.flush()
+    with open(
+        fileno,
+        "w",
+        buffering=CSV_OUTPUT_BUFFER_SIZE,
+        encoding=sys.stdout.encoding,
+        errors=sys.stdout.errors,
+        newline="",
+        closefd=False,
+    ) as stream:
+        yield stream
 
 
 def run_csv_cli(
-    rows_factory: Callable[[ET.Element], CliRows],
+    rows_factory: Callable[[Iterable[etree._Element]], CliRows],
     headers: Sequence[str],
     *,
     local_file: str | None,
@@ -59,7 +102,8 @@ def run_csv_cli(
     Common CSV CLI runner: load metadata, build rows, stream to stdout.
 
     Args:
-        rows_factory: Callable that converts the metadata root into CSV rows.
+        rows_factory: Callable that converts the streamed EntityDescriptors
+            into CSV rows.
         headers: CSV header row.
         local_file: Optional local file path override.
         url: Optional metadata URL override.
@@ -69,15 +113,22 @@ def run_csv_cli(
         error_label: Human readable label used in error messages.
     """
     try:
-        root = load_metadata_for_cli(local_file, url, default_url, timeout)
+        entities = load_metadata_for_cli(local_file, url, default_url, timeout)
     except Exception as exc:  # pragma: no cover - defensive
         print(f"Error loading metadata for {error_label}: {exc}", file=sys.stderr)
         sys.exit(1)
         return
 
-    rows = rows_factory(root)
+    try:
+        rows = rows_factory(entities)
+    except (etree.ParseError, OSError) as exc:
+        # Streaming defers reading and parsing until the rows are built
+        print(f"Error loading metadata for {error_label}: {exc}", file=sys.stderr)
+        sys.exit(1)
+        return
 
-    writer = csv.writer(sys.stdout)
-    if include_headers:
-        writer.writerow(headers)
-    writer.writerows(rows)
+    with buffered_stdout() as output:
+        writer = csv.writer(output)
+        if include_headers:
+            writer.writerow(headers)
+        writer.writerows(rows)
@@ -9,20 +9,26 @@ from .settings import (
     CONTENT_QUALITY_SLOW_MS,
     CONTENT_QUALITY_THREADS,
     CONTENT_QUALITY_VERY_SLOW_MS,
+    CSV_OUTPUT_BUFFER_SIZE,
     EDUGAIN_FEDERATIONS_API,
     EDUGAIN_METADATA_URL,
     ENABLE_CLOUDSCRAPER_RETRY,
+    ENTITY_DESCRIPTOR_TAG,
     FEDERATION_CACHE_DAYS,
     FEDERATION_CACHE_FILE,
     MAX_CONTENT_SIZE,
     METADATA_CACHE_FILE,
     METADATA_CACHE_HOURS,
+    METADATA_VALIDATORS_FILE,
     NAMESPACES,
     PROVIDER_RETRY_DELAYS,
+    REQUEST_RETRIES,
+    REQUEST_RETRY_BACKOFF,
     REQUEST_TIMEOUT,
     URL_VALIDATION_CACHE_DAYS,
     URL_VALIDATION_CACHE_FILE,
     URL_VALIDATION_DELAY,
+    URL_VALIDATION_POOL_HOSTS,
     URL_VALIDATION_THREADS,
     URL_VALIDATION_TIMEOUT,
 )
@@ -32,16 +38,22 @@ __all__ = [
     "EDUGAIN_FEDERATIONS_API",
     "METADATA_CACHE_FILE",
     "METADATA_CACHE_HOURS",
+    "METADATA_VALIDATORS_FILE",
     "FEDERATION_CACHE_FILE",
     "FEDERATION_CACHE_DAYS",
     "URL_VALIDATION_CACHE_FILE",
     "URL_VALIDATION_CACHE_DAYS",
     "REQUEST_TIMEOUT",
+    "REQUEST_RETRIES",
+    "REQUEST_RETRY_BACKOFF",
+    "CSV_OUTPUT_BUFFER_SIZE",
     "URL_VALIDATION_TIMEOUT",
     "URL_VALIDATION_DELAY",
+    "URL_VALIDATION_POOL_HOSTS",
     "URL_VALIDATION_THREADS",
     "MAX_CONTENT_SIZE",
     "NAMESPACES",
+    "ENTITY_DESCRIPTOR_TAG",
     "ENABLE_CLOUDSCRAPER_RETRY",
     "CLOUDSCRAPER_TIMEOUT",
     "CLOUDSCRAPER_RETRY_DELAY",
@@ -11,6 +11,7 @@ EDUGAIN_FEDERATIONS_API = "https://technical.edugain.org/api.php?action=list_fed
 
 # Cache settings (XDG-compliant)
 METADATA_CACHE_FILE = "metadata.xml"
+METADATA_VALIDATORS_FILE = "metadata_validators.json"  # ETag/Last-Modified of the cache
 METADATA_CACHE_HOURS = 12
 FEDERATION_CACHE_FILE = "federations.json"
 FEDERATION_CACHE_DAYS = 30
@@ -19,11 +20,17 @@ URL_VALIDATION_CACHE_DAYS = 7
 
 # HTTP request settings
 REQUEST_TIMEOUT = 30
+REQUEST_RETRIES = 3  # retries for metadata/federation API fetches on transient errors
+REQUEST_RETRY_BACKOFF = 0.3  # seconds, doubled after each retry
+
+# CSV output settings
+CSV_OUTPUT_BUFFER_SIZE = 1 << 20  # 1 MiB write buffer for CSV exports on stdout
 
 # URL validation settings
 URL_VALIDATION_TIMEOUT = 10  # seconds
 URL_VALIDATION_DELAY = 0.1  # seconds between requests
 URL_VALIDATION_THREADS = 10  # concurrent threads for URL validation
+URL_VALIDATION_POOL_HOSTS = 64  # hosts kept in the validation connection pool
 MAX_CONTENT_SIZE = 1024 * 1024  # 1MB max content size for analysis
 
 # Bot protection mitigation settings
@@ -49,7 +56,10 @@ CONTENT_QUALITY_MAX_DOWNLOAD = 102_400  # 100 KB — smaller cap than MAX_CONTEN
 CONTENT_QUALITY_SLOW_MS = 5_000
 CONTENT_QUALITY_VERY_SLOW_MS = 10_000
 
-# XML Namespaces for SAML metadata processing
+# XML Namespaces for SAML metadata processing.
+# Keep this a plain dict: lxml silently ignores other mapping types (e.g.
+# MappingProxyType) passed as XPath namespaces. The prefixes are bound once
+# when core.entities compiles its XPath objects, not on every call.
 NAMESPACES = {
     "md": "urn:oasis:names:tc:SAML:2.0:metadata",
     "mdui": "urn:oasis:names:tc:SAML:metadata:ui",
@@ -59,3 +69,6 @@ NAMESPACES = {
     "mdattr": "urn:oasis:names:tc:SAML:metadata:attribute",
     "saml": "urn:oasis:names:tc:SAML:2.0:assertion",
 }
+
+# Clark-notation ({namespace}localname) tags, built once for tag matching
+ENTITY_DESCRIPTOR_TAG = f"{{{NAMESPACES['md']}}}EntityDescriptor"
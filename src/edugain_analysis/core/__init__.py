@@ -2,13 +2,21 @@
 
 from .analysis import analyze_privacy_security, filter_entities
 from .content_analysis import analyze_content_quality
-from .entities import EntityRecord, iter_entity_records
+from .entities import (
+    EntityRecord,
+    has_security_contact,
+    has_sirtfi,
+    iter_entity_descriptors,
+    iter_entity_records,
+)
 from .metadata import (
     get_federation_mapping,
     get_metadata,
+    iter_entities,
     load_url_validation_cache,
     parse_metadata,
     save_url_validation_cache,
+    stream_entities,
 )
 from .security import (
     SSRFError,
@@ -27,6 +35,8 @@ __all__ = [
     "filter_entities",
     "get_metadata",
     "parse_metadata",
+    "iter_entities",
+    "stream_entities",
     "get_federation_mapping",
     "load_url_validation_cache",
     "save_url_validation_cache",
@@ -36,6 +46,9 @@ __all__ = [
     "analyze_content_quality",
     "EntityRecord",
     "iter_entity_records",
+    "iter_entity_descriptors",
+    "has_security_contact",
+    "has_sirtfi",
     "SSRFError",
     "validate_url_for_ssrf",
     "sanitize_csv_value",
@@ -6,12 +6,106 @@ entities with privacy statements and security contacts.
 """
 
 import sys
-import xml.etree.ElementTree as ET
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from operator import attrgetter, itemgetter
 
-from ..config import NAMESPACES, URL_VALIDATION_THREADS
-from .entities import iter_entity_records
+from lxml import etree
+
+from ..config import URL_VALIDATION_THREADS
+from .entities import iter_entity_descriptors, iter_entity_records
 from .validation import validate_urls_content_parallel, validate_urls_parallel
 
+# Filter mode -> (column getter, value that selects a row). Columns 4 and 6 of
+# an entity row are HasPrivacyStatement and HasSecurityContact.
+_ENTITY_FILTERS = {
+    "missing_privacy": (itemgetter(4), "No"),
+    "missing_security": (itemgetter(6), "No"),
+    "missing_both": (itemgetter(4, 6), ("No", "No")),
+}
+
+# The per-entity flags that every coverage counter is derived from
+_coverage_flags = attrgetter(
+    "is_sp", "is_idp", "has_privacy", "has_security", "has_sirtfi"
+)
+
+
+def _new_federation_stats() -> dict:
+    """Return a zeroed statistics dict for a single federation."""
+    return {
+        "total_entities": 0,
+        "total_sps": 0,
+        "total_idps": 0,
+        "sps_has_privacy": 0,
+        "sps_missing_privacy": 0,
+        "idps_has_privacy": 0,
+        "idps_missing_privacy": 0,
+        "sps_has_security": 0,
+        "sps_missing_security": 0,
+        "idps_has_security": 0,
+        "idps_missing_security": 0,
+        "total_has_security": 0,
+        "total_missing_security": 0,
+        "sps_has_both": 0,
+        "sps_missing_both": 0,
+        # SIRTFI statistics
+        "total_has_sirtfi": 0,
+        "sps_has_sirtfi": 0,
+        "idps_has_sirtfi": 0,
+        "total_missing_sirtfi": 0,
+        "sps_missing_sirtfi": 0,
+        "idps_missing_sirtfi": 0,
+        # URL validation statistics
+        "urls_checked": 0,
+        "urls_accessible": 0,
+        "urls_broken": 0,
+        "error_breakdown": {},  # Dict mapping error types to counts
+        "provider_stats": {  # Bot protection provider statistics
+            "total_detected": 0,
+            "by_provider": {},
+            "retry_attempted": 0,
+            "retry_success": 0,
+            "retry_failed": 0,
+        },
+    }
+
+
+def _add_coverage(
+    target: dict, flag_counts: Iterable[tuple[tuple[bool, ...], int]]
+) -> None:
+    """
+    Add privacy/security/SIRTFI coverage counters to a statistics dict.
+
+    ``flag_counts`` pairs a ``_coverage_flags`` tuple with the number of
+    entities sharing it, so each counter is updated once per distinct flag
+    combination (at most 32) rather than once per entity. Entities that are
+    both SP and IdP count as SPs, matching the entity rows.
+    """
+    for (is_sp, is_idp, has_privacy, has_security, has_sirtfi), n in flag_counts:
+        if is_sp:
+            prefix = "sps"
+            target["total_sps"] += n
+            if has_privacy and has_security:
+                target["sps_has_both"] += n
+            elif not has_privacy and not has_security:
+                target["sps_missing_both"] += n
+        elif is_idp:
+            prefix = "idps"
+            target["total_idps"] += n
+        else:
+            prefix = None
+
+        if prefix:
+            privacy = "has_privacy" if has_privacy else "missing_privacy"
+            security = "has_security" if has_security else "missing_security"
+            sirtfi = "has_sirtfi" if has_sirtfi else "missing_sirtfi"
+            target[f"{prefix}_{privacy}"] += n
+            target[f"{prefix}_{security}"] += n
+            target[f"{prefix}_{sirtfi}"] += n
+
+        target["total_has_security" if has_security else "total_missing_security"] += n
+        target["total_has_sirtfi" if has_sirtfi else "total_missing_sirtfi"] += n
+
 
 def _categorize_validation_error(validation_result: dict) -> str:
     """Categorize validation error for statistics."""
@@ -67,7 +161,7 @@ def _categorize_validation_error(validation_result: dict) -> str:
 
 
 def analyze_privacy_security(
-    root: ET.Element,
+    root: etree._Element | Iterable[etree._Element],
     federation_mapping: dict[str, str] | None = None,
     validate_urls: bool = False,
     validation_cache: dict[str, dict] | None = None,
@@ -81,7 +175,8 @@ def analyze_privacy_security(
     Security contacts are analyzed for both IdPs and SPs.
 
     Args:
-        root: XML root element of eduGAIN metadata
+        root: XML root element of eduGAIN metadata, or an iterable of
+            EntityDescriptor elements (e.g. from metadata.iter_entities())
         federation_mapping: Mapping of registration authorities to federation names
         validate_urls: Whether to perform URL validation (HTTP status + content check)
         validation_cache: Cache of previous URL validation results
@@ -138,8 +233,35 @@ def analyze_privacy_security(
     # Federation-level statistics by registration authority
     federation_stats = {}
 
-    records = list(iter_entity_records(root, federation_mapping or {}))
-    stats["total_entities"] = len(root.findall(".//md:EntityDescriptor", NAMESPACES))
+    # Count every EntityDescriptor (including those skipped for lacking an
+    # entityID) while the records are extracted, so streamed input is only
+    # consumed once.
+    descriptor_count = 0
+
+    def _counted(elements: Iterator[etree._Element]) -> Iterator[etree._Element]:
+        nonlocal descriptor_count
+        for element in elements:
+            descriptor_count += 1
+            yield element
+
+    entities = _counted(iter_entity_descriptors(root))
+    records = list(iter_entity_records(entities, federation_mapping or {}))
+    stats["total_entities"] = descriptor_count
+
+    # Coverage counters are tallied per distinct flag combination; only the
+    # URL validation statistics below still need a per-entity pass.
+    _add_coverage(stats, Counter(map(_coverage_flags, records)).items())
+    federation_coverage = Counter(
+        (record.federation_name, _coverage_flags(record))
+        for record in records
+        if record.registration_authority
+    )
+    for (federation_name, flags), n in federation_coverage.items():
+        fed_stats = federation_stats.get(federation_name)
+        if fed_stats is None:
+            fed_stats = federation_stats[federation_name] = _new_federation_stats()
+        fed_stats["total_entities"] += n
+        _add_coverage(fed_stats, ((flags, n),))
 
     # Collect all privacy URLs for parallel validation (both SPs and IdPs)
     if validate_urls:
@@ -196,57 +318,6 @@ def analyze_privacy_security(
         content_validation_results = {}
 
     for record in records:
-        is_sp = record.is_sp
-        is_idp = record.is_idp
-        ent_type_display = record.entity_type
-
-        if is_sp:
-            stats["total_sps"] += 1
-            if record.has_privacy:
-                stats["sps_has_privacy"] += 1
-            else:
-                stats["sps_missing_privacy"] += 1
-        elif is_idp:
-            stats["total_idps"] += 1
-            if record.has_privacy:
-                stats["idps_has_privacy"] += 1
-            else:
-                stats["idps_missing_privacy"] += 1
-
-        if record.has_security:
-            stats["total_has_security"] += 1
-            if is_sp:
-                stats["sps_has_security"] += 1
-            elif is_idp:
-                stats["idps_has_security"] += 1
-        else:
-            stats["total_missing_security"] += 1
-            if is_sp:
-                stats["sps_missing_security"] += 1
-            elif is_idp:
-                stats["idps_missing_security"] += 1
-
-        # Update SIRTFI statistics by entity type
-        if record.has_sirtfi:
-            stats["total_has_sirtfi"] += 1
-            if is_sp:
-                stats["sps_has_sirtfi"] += 1
-            elif is_idp:
-                stats["idps_has_sirtfi"] += 1
-        else:
-            stats["total_missing_sirtfi"] += 1
-            if is_sp:
-                stats["sps_missing_sirtfi"] += 1
-            elif is_idp:
-                stats["idps_missing_sirtfi"] += 1
-
-        # Update combined statistics (only for SPs since privacy is SP-only)
-        if is_sp:
-            if record.has_privacy and record.has_security:
-                stats["sps_has_both"] += 1
-            elif not record.has_privacy and not record.has_security:
-                stats["sps_missing_both"] += 1
-
         has_privacy_display = "Yes" if record.has_privacy else "No"
         privacy_url_display = record.privacy_url if record.has_privacy else ""
 
@@ -305,142 +376,45 @@ def analyze_privacy_security(
                         stats["content_quality_issues_breakdown"].get(issue, 0) + 1
                     )
 
-        # Update federation-level statistics (use federation name as key)
-        if record.registration_authority:
-            if record.federation_name not in federation_stats:
-                federation_stats[record.federation_name] = {
-                    "total_entities": 0,
-                    "total_sps": 0,
-                    "total_idps": 0,
-                    "sps_has_privacy": 0,
-                    "sps_missing_privacy": 0,
-                    "idps_has_privacy": 0,
-                    "idps_missing_privacy": 0,
-                    "sps_has_security": 0,
-                    "sps_missing_security": 0,
-                    "idps_has_security": 0,
-                    "idps_missing_security": 0,
-                    "total_has_security": 0,
-                    "total_missing_security": 0,
-                    "sps_has_both": 0,
-                    "sps_missing_both": 0,
-                    # SIRTFI statistics
-                    "total_has_sirtfi": 0,
-                    "sps_has_sirtfi": 0,
-                    "idps_has_sirtfi": 0,
-                    "total_missing_sirtfi": 0,
-                    "sps_missing_sirtfi": 0,
-                    "idps_missing_sirtfi": 0,
-                    # URL validation statistics
-                    "urls_checked": 0,
-                    "urls_accessible": 0,
-                    "urls_broken": 0,
-                    "error_breakdown": {},  # Dict mapping error types to counts
-                    "provider_stats": {  # Bot protection provider statistics
-                        "total_detected": 0,
-                        "by_provider": {},
-                        "retry_attempted": 0,
-                        "retry_success": 0,
-                        "retry_failed": 0,
-                    },
-                }
-
+        # Update federation URL validation stats (SPs with privacy statements)
+        if (
+            record.registration_authority
+            and record.is_sp
+            and validate_urls
+            and url_validation_result is not None
+        ):
             fed_stats = federation_stats[record.federation_name]
-            fed_stats["total_entities"] += 1
-
-            if is_sp:
-                fed_stats["total_sps"] += 1
-                if record.has_privacy:
-                    fed_stats["sps_has_privacy"] += 1
-
-                    # Update federation URL validation stats
-                    if validate_urls and url_validation_result is not None:
-                        fed_stats["urls_checked"] += 1
-                        if url_validation_result["accessible"]:
-                            fed_stats["urls_accessible"] += 1
-                        else:
-                            fed_stats["urls_broken"] += 1
-                            # Categorize and count error types
-                            error_type = _categorize_validation_error(
-                                url_validation_result
-                            )
-                            fed_stats["error_breakdown"][error_type] = (
-                                fed_stats["error_breakdown"].get(error_type, 0) + 1
-                            )
-
-                        # Track federation provider statistics
-                        protection_detected = url_validation_result.get(
-                            "protection_detected"
-                        )
-                        retry_method = url_validation_result.get("retry_method")
-                        status_code = url_validation_result.get("status_code", 0)
-
-                        if protection_detected:
-                            fed_stats["provider_stats"]["total_detected"] += 1
-                            fed_stats["provider_stats"]["by_provider"][
-                                protection_detected
-                            ] = (
-                                fed_stats["provider_stats"]["by_provider"].get(
-                                    protection_detected, 0
-                                )
-                                + 1
-                            )
-
-                        if retry_method:
-                            fed_stats["provider_stats"]["retry_attempted"] += 1
-                            if 200 <= status_code < 400:
-                                fed_stats["provider_stats"]["retry_success"] += 1
-                            else:
-                                fed_stats["provider_stats"]["retry_failed"] += 1
-
-                else:
-                    fed_stats["sps_missing_privacy"] += 1
-
-                if record.has_security:
-                    fed_stats["sps_has_security"] += 1
-                else:
-                    fed_stats["sps_missing_security"] += 1
-
-                # SP SIRTFI stats
-                if record.has_sirtfi:
-                    fed_stats["sps_has_sirtfi"] += 1
-                else:
-                    fed_stats["sps_missing_sirtfi"] += 1
-
-                if record.has_privacy and record.has_security:
-                    fed_stats["sps_has_both"] += 1
-                elif not record.has_privacy and not record.has_security:
-                    fed_stats["sps_missing_both"] += 1
+            fed_stats["urls_checked"] += 1
+            if url_validation_result["accessible"]:
+                fed_stats["urls_accessible"] += 1
+            else:
+                fed_stats["urls_broken"] += 1
+                # Categorize and count error types
+                error_type = _categorize_validation_error(url_validation_result)
+                fed_stats["error_breakdown"][error_type] = (
+                    fed_stats["error_breakdown"].get(error_type, 0) + 1
+                )
 
-            elif is_idp:
-                fed_stats["total_idps"] += 1
-                if record.has_privacy:
-                    fed_stats["idps_has_privacy"] += 1
-                else:
-                    fed_stats["idps_missing_privacy"] += 1
+            # Track federation provider statistics
+            protection_detected = url_validation_result.get("protection_detected")
+            retry_method = url_validation_result.get("retry_method")
+            status_code = url_validation_result.get("status_code", 0)
 
-                if record.has_security:
-                    fed_stats["idps_has_security"] += 1
-                else:
-                    fed_stats["idps_missing_security"] += 1
+            if protection_detected:
+                fed_stats["provider_stats"]["total_detected"] += 1
+                fed_stats["provider_stats"]["by_provider"][protection_detected] = (
+                    fed_stats["provider_stats"]["by_provider"].get(
+                        protection_detected, 0
+                    )
+                    + 1
+                )
 
-                # IdP SIRTFI stats
-                if record.has_sirtfi:
-                    fed_stats["idps_has_sirtfi"] += 1
+            if retry_method:
+                fed_stats["provider_stats"]["retry_attempted"] += 1
+                if 200 <= status_code < 400:
+                    fed_stats["provider_stats"]["retry_success"] += 1
                 else:
-                    fed_stats["idps_missing_sirtfi"] += 1
-
-            # Overall federation security stats
-            if record.has_security:
-                fed_stats["total_has_security"] += 1
-            else:
-                fed_stats["total_missing_security"] += 1
-
-            # Overall federation SIRTFI stats
-            if record.has_sirtfi:
-                fed_stats["total_has_sirtfi"] += 1
-            else:
-                fed_stats["total_missing_sirtfi"] += 1
+                    fed_stats["provider_stats"]["retry_failed"] += 1
 
         # Prepare validation data for entity list
         if validate_urls and url_validation_result is not None:
@@ -459,39 +433,28 @@ def analyze_privacy_security(
             validation_error = "" if not validate_urls else "URL validation disabled"
 
         # Add entity data (use federation name for display, but keep using registration_authority for federation_stats)
+        row = [
+            record.federation_name,
+            record.entity_type,
+            record.org_name,
+            record.entity_id,
+            has_privacy_display,
+            privacy_url_display,
+            "Yes" if record.has_security else "No",
+            "Yes" if record.has_sirtfi else "No",
+        ]
         if validate_urls:
             # Extended format with enhanced validation results
-            entities_list.append(
-                [
-                    record.federation_name,
-                    ent_type_display,
-                    record.org_name,
-                    record.entity_id,
-                    has_privacy_display,
-                    privacy_url_display,
-                    "Yes" if record.has_security else "No",
-                    "Yes" if record.has_sirtfi else "No",
+            row.extend(
+                (
                     str(url_status),
                     final_url,
                     url_accessible,
                     str(redirect_count),
                     validation_error,
-                ]
-            )
-        else:
-            # Original format without validation
-            entities_list.append(
-                [
-                    record.federation_name,
-                    ent_type_display,
-                    record.org_name,
-                    record.entity_id,
-                    has_privacy_display,
-                    privacy_url_display,
-                    "Yes" if record.has_security else "No",
-                    "Yes" if record.has_sirtfi else "No",
-                ]
+                )
             )
+        entities_list.append(row)
 
     return entities_list, stats, federation_stats
 
@@ -509,11 +472,9 @@ def filter_entities(
     Returns:
         List[List[str]]: Filtered entity data
     """
-    if filter_mode == "missing_privacy":
-        return [e for e in entities_list if e[4] == "No"]  # HasPrivacyStatement column
-    elif filter_mode == "missing_security":
-        return [e for e in entities_list if e[6] == "No"]  # HasSecurityContact column
-    elif filter_mode == "missing_both":
-        return [e for e in entities_list if e[4] == "No" and e[6] == "No"]
-    else:
+    entity_filter = _ENTITY_FILTERS.get(filter_mode)
+    if entity_filter is None:
         return entities_list
+
+    get_columns, selected = entity_filter
+    return [e for e in entities_list if get_columns(e) == selected]
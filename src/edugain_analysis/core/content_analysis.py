@@ -8,7 +8,7 @@ GDPR compliance keywords, and producing an actionable quality score.
 
 from __future__ import annotations
 
-from bs4 import BeautifulSoup
+from typing import TYPE_CHECKING
 
 from ..config import (
     CONTENT_QUALITY_EMPTY_THRESHOLD,
@@ -17,6 +17,9 @@ from ..config import (
     CONTENT_QUALITY_VERY_SLOW_MS,
 )
 
+if TYPE_CHECKING:
+    from bs4 import BeautifulSoup
+
 # ---------------------------------------------------------------------------
 # Keyword / pattern data
 # ---------------------------------------------------------------------------
@@ -202,6 +205,17 @@ SOFT_404_BODY: list[str] = [
 # ---------------------------------------------------------------------------
 
 
+def _parse_html(html: str) -> BeautifulSoup:
+    """Parse HTML with lxml, falling back to the stdlib parser."""
+    # Imported here so every CLI entry point does not pay for bs4 at startup
+    from bs4 import BeautifulSoup
+
+    try:
+        return BeautifulSoup(html, "lxml")
+    except Exception:
+        return BeautifulSoup(html, "html.parser")
+
+
 def detect_soft_404(html: str, url: str) -> bool:
     """Detect pages that return HTTP 200 but display error content.
 
@@ -212,10 +226,7 @@ def detect_soft_404(html: str, url: str) -> bool:
     Returns:
         True if the page appears to be a soft-404 error page.
     """
-    try:
-        soup = BeautifulSoup(html, "lxml")
-    except Exception:
-        soup = BeautifulSoup(html, "html.parser")
+    soup = _parse_html(html)
 
     # Check page title
     title_tag = soup.find("title")
@@ -279,10 +290,7 @@ def detect_language(html: str) -> str | None:
     Returns:
         ISO 639-1 language code (e.g. "en", "de") or None if undetermined.
     """
-    try:
-        soup = BeautifulSoup(html, "lxml")
-    except Exception:
-        soup = BeautifulSoup(html, "html.parser")
+    soup = _parse_html(html)
 
     # 1. HTML lang attribute
     html_tag = soup.find("html")
@@ -368,10 +376,7 @@ def analyze_content_quality(
     https_enabled = url.lower().startswith("https://")
 
     # Parse HTML once for reuse
-    try:
-        soup = BeautifulSoup(html, "lxml")
-    except Exception:
-        soup = BeautifulSoup(html, "html.parser")
+    soup = _parse_html(html)
 
     content_length = len(html.encode("utf-8", errors="replace"))
     text = soup.get_text(separator=" ", strip=True)
@@ -5,17 +5,68 @@ Provides a single source of truth for parsing entity metadata so that
 all CLI entry points operate on consistent data.
 """
 
-import xml.etree.ElementTree as ET
-from collections.abc import Iterable
+import sys
+from collections.abc import Callable, Iterable, Iterator
 from dataclasses import dataclass
 
+from lxml import etree
+
 from ..config import NAMESPACES
 from .metadata import map_registration_authority
 
 SIRTFI_VALUE = "https://refeds.org/sirtfi"
 
 
-@dataclass(frozen=True)
+def _xpath(expr: str) -> etree.XPath:
+    """Compile an XPath expression once against the SAML namespaces."""
+    # smart_strings=False keeps string results from pinning their source
+    # element, which matters when entities are streamed and cleared.
+    return etree.XPath(expr, namespaces=NAMESPACES, smart_strings=False)
+
+
+# XPath expressions are compiled once at import and reused for every entity.
+# lxml resolves the namespace prefixes at compile time and evaluates each
+# query in C, so a Python-level walk over the entity children is no faster.
+_ENTITY_DESCRIPTORS_XP = _xpath(".//md:EntityDescriptor")
+_ORG_NAME_XP = _xpath("(./md:Organization/md:OrganizationDisplayName)[1]")
+_IS_SP_XP = _xpath("boolean(./md:SPSSODescriptor)")
+_IS_IDP_XP = _xpath("boolean(./md:IDPSSODescriptor)")
+_PRIVACY_URL_XP = _xpath("(.//mdui:PrivacyStatementURL)[1]")
+_HAS_SECURITY_XP = _xpath(
+    "boolean("
+    './md:ContactPerson[@remd:contactType="http://refeds.org/metadata/contactType/security"]'
+    " | "
+    './md:ContactPerson[@icmd:contactType="http://id.incommon.org/metadata/contactType/security"]'
+    ")"
+)
+_HAS_SIRTFI_XP = _xpath(
+    "boolean("
+    "./md:Extensions/mdattr:EntityAttributes"
+    '/saml:Attribute[@Name="urn:oasis:names:tc:SAML:attribute:assurance-certification"]'
+    f'/saml:AttributeValue[text()="{SIRTFI_VALUE}"]'
+    ")"
+)
+_REGISTRATION_AUTHORITY_XP = _xpath(
+    "string((./md:Extensions/mdrpi:RegistrationInfo)[1]/@registrationAuthority)"
+)
+
+# Shared role tuples and labels, so records for the same kind of entity
+# reference one object instead of building a fresh tuple/string each time
+_ROLES = {
+    (False, False): (),
+    (True, False): ("SP",),
+    (False, True): ("IdP",),
+    (True, True): ("SP", "IdP"),
+}
+_ENTITY_TYPE_LABELS = {
+    (): "Unknown",
+    ("SP",): "SP",
+    ("IdP",): "IdP",
+    ("SP", "IdP"): "SP+IdP",
+}
+
+
+@dataclass(frozen=True, slots=True)
 class EntityRecord:
     """Normalized view of a single EntityDescriptor."""
 
@@ -32,11 +83,10 @@ class EntityRecord:
     @property
     def entity_type(self) -> str:
         """Return a display label for the entity roles."""
-        if not self.roles:
-            return "Unknown"
-        if len(self.roles) == 1:
-            return self.roles[0]
-        return "+".join(self.roles)
+        label = _ENTITY_TYPE_LABELS.get(self.roles)
+        if label is None:
+            return "+".join(self.roles)
+        return label
 
     @property
     def is_sp(self) -> bool:
@@ -49,66 +99,72 @@ class EntityRecord:
         return "IdP" in self.roles
 
 
+def iter_entity_descriptors(
+    source: etree._Element | Iterable[etree._Element],
+) -> Iterator[etree._Element]:
+    """
+    Yield EntityDescriptor elements from a metadata root or an entity stream.
+
+    A root element is searched for (nested) EntityDescriptors; anything else
+    is assumed to already be an iterable of EntityDescriptor elements, such
+    as the generator returned by metadata.iter_entities().
+    """
+    if hasattr(source, "tag"):
+        return iter(_ENTITY_DESCRIPTORS_XP(source))
+    return iter(source)
+
+
+def has_security_contact(entity: etree._Element) -> bool:
+    """True if the EntityDescriptor publishes a REFEDS or InCommon security contact."""
+    return _HAS_SECURITY_XP(entity)
+
+
+def has_sirtfi(entity: etree._Element) -> bool:
+    """True if the EntityDescriptor carries the SIRTFI assurance certification."""
+    return _HAS_SIRTFI_XP(entity)
+
+
 def iter_entity_records(
-    root: ET.Element, federation_mapping: dict[str, str] | None = None
+    root: etree._Element | Iterable[etree._Element],
+    federation_mapping: dict[str, str] | None = None,
+    prefilter: Callable[[etree._Element], bool] | None = None,
 ) -> Iterable[EntityRecord]:
     """
     Yield normalized entity records from the provided metadata root.
+
+    ``root`` may also be an iterable of EntityDescriptor elements, which lets
+    callers stream entities instead of parsing the whole document up front.
+    When ``prefilter`` is given, EntityDescriptors for which it returns False
+    are skipped before any other field is extracted.
     """
     federation_mapping = federation_mapping or {}
 
-    privacy_xpath = ".//mdui:PrivacyStatementURL"
-    sec_contact_refeds = './md:ContactPerson[@remd:contactType="http://refeds.org/metadata/contactType/security"]'
-    sec_contact_incommon = './md:ContactPerson[@icmd:contactType="http://id.incommon.org/metadata/contactType/security"]'
-    sirtfi_xpath = './md:Extensions/mdattr:EntityAttributes/saml:Attribute[@Name="urn:oasis:names:tc:SAML:attribute:assurance-certification"]/saml:AttributeValue'
-    reg_info_xpath = "./md:Extensions/mdrpi:RegistrationInfo"
-    org_name_xpath = "./md:Organization/md:OrganizationDisplayName"
-    sp_descriptor_xpath = "./md:SPSSODescriptor"
-    idp_descriptor_xpath = "./md:IDPSSODescriptor"
+    for entity in iter_entity_descriptors(root):
+        if prefilter is not None and not prefilter(entity):
+            continue
 
-    for entity in root.findall(".//md:EntityDescriptor", NAMESPACES):
         entity_id = entity.attrib.get("entityID", "").strip()
         if not entity_id:
             continue
 
-        orgname_elem = entity.find(org_name_xpath, NAMESPACES)
+        orgname_elems = _ORG_NAME_XP(entity)
         org_name = (
-            orgname_elem.text.strip()
-            if orgname_elem is not None and orgname_elem.text
+            orgname_elems[0].text.strip()
+            if orgname_elems and orgname_elems[0].text
             else "Unknown"
         )
 
-        is_sp = entity.find(sp_descriptor_xpath, NAMESPACES) is not None
-        is_idp = entity.find(idp_descriptor_xpath, NAMESPACES) is not None
+        roles = _ROLES[_IS_SP_XP(entity), _IS_IDP_XP(entity)]
 
-        roles: list[str] = []
-        if is_sp:
-            roles.append("SP")
-        if is_idp:
-            roles.append("IdP")
+        privacy_elems = _PRIVACY_URL_XP(entity)
+        has_privacy = bool(privacy_elems and privacy_elems[0].text)
+        privacy_url = privacy_elems[0].text.strip() if has_privacy else ""
 
-        privacy_elem = entity.find(privacy_xpath, NAMESPACES)
-        has_privacy = bool(privacy_elem is not None and privacy_elem.text)
-        privacy_url = privacy_elem.text.strip() if has_privacy else ""
-
-        sec_contact_refeds_elem = entity.find(sec_contact_refeds, NAMESPACES)
-        sec_contact_incommon_elem = entity.find(sec_contact_incommon, NAMESPACES)
-        has_security = (sec_contact_refeds_elem is not None) or (
-            sec_contact_incommon_elem is not None
-        )
-
-        has_sirtfi = any(
-            ec.text == SIRTFI_VALUE
-            for ec in entity.findall(sirtfi_xpath, NAMESPACES)
-            if ec.text
-        )
+        has_security = _HAS_SECURITY_XP(entity)
+        has_sirtfi = _HAS_SIRTFI_XP(entity)
 
-        registration_info = entity.find(reg_info_xpath, NAMESPACES)
-        registration_authority = ""
-        if registration_info is not None:
-            registration_authority = registration_info.attrib.get(
-                "registrationAuthority", ""
-            ).strip()
+        # A few dozen authorities repeat across thousands of entities
+        registration_authority = sys.intern(_REGISTRATION_AUTHORITY_XP(entity).strip())
 
         federation_name = map_registration_authority(
             registration_authority, federation_mapping
@@ -116,7 +172,7 @@ def iter_entity_records(
 
         yield EntityRecord(
             entity_id=entity_id,
-            roles=tuple(roles),
+            roles=roles,
             org_name=org_name,
             registration_authority=registration_authority,
             federation_name=federation_name,
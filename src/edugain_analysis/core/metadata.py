@@ -9,24 +9,33 @@ Provides functionality for:
 - XDG-compliant cache utilities
 """
 
+import io
 import json
 import os
 import sys
 import time
-import xml.etree.ElementTree as ET
+from collections.abc import Iterator
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any
+from typing import IO, Any
 
 import requests
+from lxml import etree
+from requests.adapters import HTTPAdapter
+from urllib3 import exceptions as urllib3_exceptions
+from urllib3.util.retry import Retry
 
 from ..config import (
     EDUGAIN_FEDERATIONS_API,
     EDUGAIN_METADATA_URL,
+    ENTITY_DESCRIPTOR_TAG,
     FEDERATION_CACHE_DAYS,
     FEDERATION_CACHE_FILE,
     METADATA_CACHE_FILE,
     METADATA_CACHE_HOURS,
+    METADATA_VALIDATORS_FILE,
+    REQUEST_RETRIES,
+    REQUEST_RETRY_BACKOFF,
     REQUEST_TIMEOUT,
     URL_VALIDATION_CACHE_DAYS,
     URL_VALIDATION_CACHE_FILE,
@@ -143,6 +152,84 @@ def is_metadata_cache_valid() -> bool:
         return False
 
 
+_METADATA_REQUEST_HEADERS = {
+    "User-Agent": "eduGAIN-Quality-Analysis/2.0 (Metadata fetcher)",
+    "Accept": "application/xml, text/xml, */*",
+}
+
+# Shared HTTP session for metadata and federation API requests (created lazily)
+_http_session = None
+
+
+def _get_http_session() -> requests.Session:
+    """
+    Get or create the shared session for metadata and federation API requests.
+
+    Reusing one session keeps connections alive between fetches, and its
+    adapters retry connection failures and gateway errors with backoff.
+    """
+    global _http_session
+    if _http_session is None:
+        retries = Retry(
+            total=REQUEST_RETRIES,
+            backoff_factor=REQUEST_RETRY_BACKOFF,
+            status_forcelist=(502, 503, 504),
+            # Hand the final error response back so raise_for_status() reports it
+            raise_on_status=False,
+        )
+        session = requests.Session()
+        session.mount("https://", HTTPAdapter(max_retries=retries))
+        session.mount("http://", HTTPAdapter(max_retries=retries))
+        _http_session = session
+    return _http_session
+
+
+# Response headers identifying a metadata version, and the request headers
+# that send them back to make a download conditional
+_CONDITIONAL_REQUEST_HEADERS = {
+    "ETag": "If-None-Match",
+    "Last-Modified": "If-Modified-Since",
+}
+
+
+def _download_metadata(
+    url: str, timeout: int, validators: dict[str, str] | None = None
+) -> tuple[bytes | None, dict[str, str]]:
+    """
+    Download metadata, conditionally if validators of a cached copy are given.
+
+    Returns:
+        The response body (None if the server answered 304 Not Modified) and
+        the ETag/Last-Modified validators describing that body.
+    """
+    print(f"Downloading metadata from {url}...", file=sys.stderr)
+
+    headers = _METADATA_REQUEST_HEADERS
+    if validators:
+        headers = {
+            **headers,
+            **{
+                _CONDITIONAL_REQUEST_HEADERS[name]: value
+                for name, value in validators.items()
+                if name in _CONDITIONAL_REQUEST_HEADERS
+            },
+        }
+
+    response = _get_http_session().get(url, timeout=timeout, headers=headers)
+    if validators and response.status_code == 304:
+        print("Metadata not modified since last download", file=sys.stderr)
+        return None, validators
+    response.raise_for_status()
+
+    print(f"Downloaded {len(response.content):,} bytes", file=sys.stderr)
+    response_validators = {
+        name: response.headers[name]
+        for name in _CONDITIONAL_REQUEST_HEADERS
+        if name in response.headers
+    }
+    return response.content, response_validators
+
+
 def download_metadata(url: str, timeout: int = REQUEST_TIMEOUT) -> bytes:
     """
     Download metadata from URL with proper error handling.
@@ -157,28 +244,20 @@ def download_metadata(url: str, timeout: int = REQUEST_TIMEOUT) -> bytes:
     Raises:
         requests.RequestException: If download fails
     """
-    print(f"Downloading metadata from {url}...", file=sys.stderr)
-
-    response = requests.get(
-        url,
-        timeout=timeout,
-        headers={
-            "User-Agent": "eduGAIN-Quality-Analysis/2.0 (Metadata fetcher)",
-            "Accept": "application/xml, text/xml, */*",
-        },
-    )
-    response.raise_for_status()
-
-    print(f"Downloaded {len(response.content):,} bytes", file=sys.stderr)
-    return response.content
+    content, _ = _download_metadata(url, timeout)
+    return content
 
 
-def save_metadata_cache(content: bytes) -> None:
+def save_metadata_cache(
+    content: bytes, validators: dict[str, str] | None = None
+) -> None:
     """
     Save metadata content to cache file.
 
     Args:
         content: Raw metadata content to save
+        validators: ETag/Last-Modified headers of the download, kept so the
+            cache can be revalidated once it expires
     """
     cache_file = get_cache_file(METADATA_CACHE_FILE)
     try:
@@ -187,6 +266,51 @@ def save_metadata_cache(content: bytes) -> None:
         print(f"Metadata cached to {cache_file}", file=sys.stderr)
     except OSError as e:
         print(f"Warning: Could not save metadata cache: {e}", file=sys.stderr)
+        return
+
+    # Always rewrite, so validators of an older download never outlive it
+    save_json_cache(METADATA_VALIDATORS_FILE, validators or {})
+
+
+def load_metadata_validators() -> dict[str, str]:
+    """
+    Load the ETag/Last-Modified validators of the cached metadata.
+
+    Returns:
+        Dict[str, str]: Validators, or an empty dict if there is no cached
+        metadata or nothing was recorded for it
+    """
+    if not get_cache_file(METADATA_CACHE_FILE).exists():
+        return {}
+
+    try:
+        with open(get_cache_file(METADATA_VALIDATORS_FILE), encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+    if not isinstance(data, dict):
+        return {}
+    return {
+        name: value
+        for name, value in data.items()
+        if name in _CONDITIONAL_REQUEST_HEADERS and isinstance(value, str)
+    }
+
+
+def _reuse_metadata_cache() -> bytes | None:
+    """Read the expired metadata cache and mark it fresh after a 304 response."""
+    cache_file = get_cache_file(METADATA_CACHE_FILE)
+    try:
+        with open(cache_file, "rb") as f:
+            content = f.read()
+        os.utime(cache_file)
+    except OSError as e:
+        print(f"Warning: Could not reuse metadata cache: {e}", file=sys.stderr)
+        return None
+
+    print(f"Using revalidated metadata from {cache_file}", file=sys.stderr)
+    return content
 
 
 def load_metadata_cache() -> bytes | None:
@@ -216,6 +340,9 @@ def get_metadata(
     """
     Get eduGAIN metadata with intelligent caching.
 
+    Once the cache expires, the download is made conditional on the cached
+    copy's ETag/Last-Modified, so an unchanged feed is not transferred again.
+
     Args:
         url: Metadata URL (defaults to eduGAIN metadata endpoint)
         timeout: Request timeout in seconds
@@ -223,27 +350,51 @@ def get_metadata(
     Returns:
         bytes: Raw metadata content
     """
-    use_cache = url == EDUGAIN_METADATA_URL
+    # Only the default metadata feed is cached
+    if url != EDUGAIN_METADATA_URL:
+        return download_metadata(url, timeout)
+
+    cached_content = load_metadata_cache()
+    if cached_content:
+        return cached_content
+
+    # An expired cache is revalidated rather than downloaded again blindly
+    content, validators = _download_metadata(url, timeout, load_metadata_validators())
+    if content is None:
+        content = _reuse_metadata_cache()
+        if content is not None:
+            return content
+        content, validators = _download_metadata(url, timeout)
+
+    save_metadata_cache(content, validators)
+    return content
 
-    # Try to load from cache first (only for the default metadata URL)
-    if use_cache:
-        cached_content = load_metadata_cache()
-        if cached_content:
-            return cached_content
 
-    # Download fresh metadata
-    content = download_metadata(url, timeout)
+# Shared by parse_metadata() and iter_entities(). Custom entity declarations
+# are left unexpanded: SAML metadata has no use for them and the input may
+# come from an arbitrary --source URL. Predefined and character references
+# (&amp;, &#233;) are unaffected. DTDs are never fetched, and comments and
+# processing instructions are dropped so they neither take up memory nor
+# split element text.
+_PARSER_OPTIONS = {
+    "huge_tree": True,
+    "collect_ids": False,
+    "resolve_entities": False,
+    "load_dtd": False,
+    "no_network": True,
+    "remove_comments": True,
+    "remove_pis": True,
+}
 
-    # Save to cache only for the default metadata feed
-    if use_cache:
-        save_metadata_cache(content)
 
-    return content
+def _metadata_parser() -> etree.XMLParser:
+    """Create an lxml parser suited to the (large) eduGAIN aggregate."""
+    return etree.XMLParser(**_PARSER_OPTIONS)
 
 
 def parse_metadata(
     content: bytes | None = None, local_file: str | None = None
-) -> ET.Element:
+) -> etree._Element:
     """
     Parse eduGAIN metadata XML content or local file.
 
@@ -252,32 +403,158 @@ def parse_metadata(
         local_file: Path to local XML file (optional)
 
     Returns:
-        ET.Element: Root element of parsed XML
+        etree._Element: Root element of parsed XML
 
     Raises:
-        ET.ParseError: If XML parsing fails
+        etree.ParseError: If XML parsing fails
         FileNotFoundError: If local file doesn't exist
     """
     if local_file:
         print(f"Parsing local metadata file: {local_file}", file=sys.stderr)
+        # libxml2 reports a missing file as a generic OSError; keep the
+        # more specific exception callers rely on.
+        if not os.path.isfile(local_file):
+            raise FileNotFoundError(f"Local metadata file not found: {local_file}")
         try:
-            tree = ET.parse(local_file)
+            tree = etree.parse(local_file, _metadata_parser())
             return tree.getroot()
-        except FileNotFoundError:
-            raise FileNotFoundError(f"Local metadata file not found: {local_file}")
-        except ET.ParseError as e:
-            raise ET.ParseError(f"Failed to parse local metadata file: {e}")
+        except etree.ParseError as e:
+            raise etree.ParseError(
+                f"Failed to parse local metadata file: {e}", e.code, *e.position
+            )
 
     elif content:
         print("Parsing metadata content...", file=sys.stderr)
         try:
-            return ET.fromstring(content)
-        except ET.ParseError as e:
-            raise ET.ParseError(f"Failed to parse metadata content: {e}")
+            return etree.fromstring(content, _metadata_parser())
+        except etree.ParseError as e:
+            raise etree.ParseError(
+                f"Failed to parse metadata content: {e}", e.code, *e.position
+            )
+
+    else:
+        raise ValueError("Either content or local_file must be provided")
+
 
+def iter_entities(
+    content: bytes | None = None, local_file: str | None = None
+) -> Iterator[etree._Element]:
+    """
+    Stream EntityDescriptor elements from metadata content or a local file.
+
+    Unlike parse_metadata(), the full document is never held in memory: each
+    EntityDescriptor is cleared, together with already processed siblings,
+    as soon as the caller advances to the next one. Consumers must therefore
+    extract what they need from an element before requesting the next.
+
+    Args:
+        content: Raw XML content (optional)
+        local_file: Path to local XML file (optional)
+
+    Yields:
+        etree._Element: One EntityDescriptor element at a time
+
+    Raises:
+        etree.ParseError: If XML parsing fails
+        FileNotFoundError: If local file doesn't exist
+    """
+    if local_file:
+        print(f"Parsing local metadata file: {local_file}", file=sys.stderr)
+        if not os.path.isfile(local_file):
+            raise FileNotFoundError(f"Local metadata file not found: {local_file}")
+        source = local_file
+        error_label = "local metadata file"
+    elif content:
+        print("Parsing metadata content...", file=sys.stderr)
+        source = io.BytesIO(content)
+        error_label = "metadata content"
     else:
         raise ValueError("Either content or local_file must be provided")
 
+    yield from _iterparse_entities(source, error_label)
+
+
+# urllib3 errors raised while reading a streamed body, and the requests
+# exceptions Response.iter_content() reports them as
+_STREAM_READ_ERRORS = {
+    urllib3_exceptions.ProtocolError: requests.exceptions.ChunkedEncodingError,
+    urllib3_exceptions.DecodeError: requests.exceptions.ContentDecodingError,
+    urllib3_exceptions.ReadTimeoutError: requests.exceptions.ConnectionError,
+    urllib3_exceptions.SSLError: requests.exceptions.SSLError,
+}
+
+
+def stream_entities(
+    url: str, timeout: int = REQUEST_TIMEOUT
+) -> Iterator[etree._Element]:
+    """
+    Stream EntityDescriptor elements straight from a metadata URL.
+
+    The response body is handed to iterparse as it arrives, with any gzip or
+    deflate Content-Encoding undone on the fly, so download and parsing
+    overlap and the raw document is never held in memory. Nothing is cached;
+    use get_metadata() for the (cached) default eduGAIN feed. The request is
+    only sent once iteration starts, and elements are released exactly as in
+    iter_entities().
+
+    Args:
+        url: Metadata URL to stream from
+        timeout: Request timeout in seconds
+
+    Yields:
+        etree._Element: One EntityDescriptor element at a time
+
+    Raises:
+        requests.RequestException: If the download fails, including when the
+            connection drops or times out partway through the body
+        etree.ParseError: If XML parsing fails
+    """
+    print(f"Streaming metadata from {url}...", file=sys.stderr)
+
+    with _get_http_session().get(
+        url, timeout=timeout, headers=_METADATA_REQUEST_HEADERS, stream=True
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        try:
+            yield from _iterparse_entities(response.raw, f"metadata from {url}")
+        except urllib3_exceptions.HTTPError as e:
+            # Reading response.raw bypasses requests' own exception mapping;
+            # translate like Response.iter_content() does so callers only
+            # need to handle requests.RequestException.
+            error_class = next(
+                (
+                    requests_error
+                    for urllib3_error, requests_error in _STREAM_READ_ERRORS.items()
+                    if isinstance(e, urllib3_error)
+                ),
+                requests.exceptions.ConnectionError,
+            )
+            raise error_class(f"Failed to read metadata from {url}: {e}") from e
+
+
+def _iterparse_entities(
+    source: str | IO[bytes], error_label: str
+) -> Iterator[etree._Element]:
+    """Yield EntityDescriptors from a path or binary stream, clearing as we go."""
+    context = etree.iterparse(
+        source,
+        events=("end",),
+        tag=ENTITY_DESCRIPTOR_TAG,
+        **_PARSER_OPTIONS,
+    )
+    try:
+        for _, element in context:
+            yield element
+            # Release the entity and every sibling parsed before it
+            element.clear(keep_tail=True)
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+    except etree.ParseError as e:
+        raise etree.ParseError(
+            f"Failed to parse {error_label}: {e}", e.code, *e.position
+        )
+
 
 def load_federation_cache() -> dict[str, str] | None:
     """
@@ -338,7 +615,7 @@ def fetch_federation_names() -> dict[str, str]:
     )
 
     try:
-        response = requests.get(
+        response = _get_http_session().get(
             EDUGAIN_FEDERATIONS_API,
             timeout=REQUEST_TIMEOUT,
             headers={
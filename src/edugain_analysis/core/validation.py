@@ -5,6 +5,7 @@ Provides HTTP accessibility validation of privacy statement URLs.
 """
 
 import concurrent.futures
+import http.cookiejar
 import os
 import sys
 import threading
@@ -13,8 +14,8 @@ from datetime import datetime
 from urllib.parse import urlparse
 
 import certifi
-import cloudscraper
 import requests
+from requests.adapters import HTTPAdapter
 
 from ..config import (
     CLOUDSCRAPER_RETRY_DELAY,
@@ -24,12 +25,20 @@ from ..config import (
     ENABLE_CLOUDSCRAPER_RETRY,
     PROVIDER_RETRY_DELAYS,
     URL_VALIDATION_DELAY,
+    URL_VALIDATION_POOL_HOSTS,
     URL_VALIDATION_THREADS,
     URL_VALIDATION_TIMEOUT,
 )
 from .security import SSRFError, validate_url_for_ssrf
 
-GET_FALLBACK_STATUS_CODES = {301, 302, 303, 307, 308, 403, 405}
+GET_FALLBACK_STATUS_CODES = {301, 302, 303, 307, 308, 403, 405, 501}
+# HEAD responses meaning the server does not support HEAD at all
+HEAD_UNSUPPORTED_STATUS_CODES = {405, 501}
+
+# Hosts that answered HEAD with HEAD_UNSUPPORTED_STATUS_CODES; further
+# URLs on them are checked with GET straight away. Reset by
+# _reset_hosts_without_head() at the start of every parallel run.
+_hosts_without_head: set[str] = set()
 
 # Global rate limiting semaphore
 _url_validation_semaphore = None
@@ -37,6 +46,38 @@ _url_validation_semaphore = None
 # Global CA bundle path (cached)
 _ca_bundle_path = None
 
+# Shared session for URL validation requests (created lazily)
+_validation_session = None
+
+
+def _get_validation_session() -> requests.Session:
+    """
+    Get or create the session shared by all URL validation threads.
+
+    Privacy statements of many entities live on the same few hosts, so
+    keeping connections alive saves a TCP and TLS handshake per URL. The
+    pool holds a connection per worker thread; failed requests are not
+    retried, since the error itself is what gets reported. Cookies are
+    refused, so every check stays independent of the URLs visited before.
+    """
+    global _validation_session
+    if _validation_session is None:
+        pool_size = max(URL_VALIDATION_THREADS, CONTENT_QUALITY_THREADS)
+        session = requests.Session()
+        session.cookies.set_policy(
+            http.cookiejar.DefaultCookiePolicy(allowed_domains=[])
+        )
+        for prefix in ("https://", "http://"):
+            session.mount(
+                prefix,
+                HTTPAdapter(
+                    pool_connections=URL_VALIDATION_POOL_HOSTS,
+                    pool_maxsize=pool_size,
+                ),
+            )
+        _validation_session = session
+    return _validation_session
+
 
 def _get_ca_bundle_path() -> str:
     """
@@ -72,6 +113,13 @@ def _get_ca_bundle_path() -> str:
     return _ca_bundle_path
 
 
+def _reset_hosts_without_head() -> None:
+    """Forget hosts that rejected HEAD in an earlier validation run."""
+    # Both parallel entry points reach validate_privacy_url(), and a server
+    # may have started supporting HEAD since the previous run
+    _hosts_without_head.clear()
+
+
 def _get_url_validation_semaphore(
     max_concurrent: int = URL_VALIDATION_THREADS,
 ) -> threading.Semaphore:
@@ -258,6 +306,9 @@ def _retry_with_cloudscraper(
     Returns:
         Tuple of (status_code, final_url, redirect_count, protection_detected, protection_headers)
     """
+    # Only needed for the rare bot-protection retry; keep it off CLI startup
+    import cloudscraper
+
     try:
         # Add delay before retry (provider-specific if available)
         delay = PROVIDER_RETRY_DELAYS.get(provider, CLOUDSCRAPER_RETRY_DELAY)
@@ -399,20 +450,29 @@ def validate_privacy_url(
 
         # Get the best CA bundle path for SSL verification
         ca_bundle = _get_ca_bundle_path()
+        session = _get_validation_session()
 
         # Simple HTTP HEAD request to check accessibility
-        response = requests.head(
-            url,
-            timeout=URL_VALIDATION_TIMEOUT,
-            headers=headers,
-            allow_redirects=True,
-            verify=ca_bundle,
-        )
+        response = None
+        if parsed.netloc.lower() not in _hosts_without_head:
+            response = session.head(
+                url,
+                timeout=URL_VALIDATION_TIMEOUT,
+                headers=headers,
+                allow_redirects=True,
+                verify=ca_bundle,
+            )
+            if response.status_code in HEAD_UNSUPPORTED_STATUS_CODES:
+                # After redirects the refusal comes from the final host
+                _hosts_without_head.add(urlparse(response.url).netloc.lower())
+
+            # Some sites block HEAD; fallback to lightweight GET in those cases
+            if response.status_code in GET_FALLBACK_STATUS_CODES:
+                response.close()
+                response = None
 
-        # Some sites block HEAD; fallback to lightweight GET in those cases
-        if response.status_code in GET_FALLBACK_STATUS_CODES:
-            response.close()
-            response = requests.get(
+        if response is None:
+            response = session.get(
                 url,
                 timeout=URL_VALIDATION_TIMEOUT,
                 headers=headers,
@@ -611,6 +671,7 @@ def validate_url_with_content(
         return base_result
 
     ca_bundle = _get_ca_bundle_path()
+    session = _get_validation_session()
     semaphore = _get_content_validation_semaphore() if use_semaphore else None
 
     if semaphore:
@@ -621,7 +682,7 @@ def validate_url_with_content(
 
         start_ms = int(_time.monotonic() * 1000)
         try:
-            response = requests.get(
+            response = session.get(
                 fetch_url,
                 timeout=URL_VALIDATION_TIMEOUT,
                 headers={
@@ -701,6 +762,7 @@ def validate_urls_content_parallel(
     """
     if validation_cache is None:
         validation_cache = {}
+    _reset_hosts_without_head()
 
     # Pre-filter cached (content_analyzed) entries
     uncached = [
@@ -789,6 +851,7 @@ def validate_urls_parallel(
     """
     if not urls:
         return {}
+    _reset_hosts_without_head()
 
     from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -11,296 +11,179 @@ import csv
 import sys
 
 
+def _coverage_emoji(pct: float) -> str:
+    """Return the traffic-light emoji for a coverage percentage."""
+    return "🟢" if pct >= 80 else "🟡" if pct >= 50 else "🔴"
+
+
+def _role_breakdown(
+    sp_count: int, idp_count: int, total_sps: int, total_idps: int
+) -> list[str]:
+    """Build the SP/IdP tree lines shown under a coverage headline."""
+    rows = []
+    if total_sps > 0:
+        rows.append(("SPs", sp_count, total_sps))
+    if total_idps > 0:
+        rows.append(("IdPs", idp_count, total_idps))
+
+    lines = []
+    for index, (label, count, role_total) in enumerate(rows):
+        pct = count / role_total * 100
+        branch = "└─" if index == len(rows) - 1 else "├─"
+        lines.append(
+            f"  {branch} {label}: {_coverage_emoji(pct)} {count:,}/{role_total:,} ({pct:.1f}%)"
+        )
+    return lines
+
+
 def print_summary(stats: dict) -> None:
     """Print summary statistics with positive framing."""
     total = stats["total_entities"]
-    total_sps = stats["total_sps"]
-    total_idps = stats["total_idps"]
 
     if total == 0:
         print("No entities found in metadata.", file=sys.stderr)
         return
 
-    print(
-        "\n=== eduGAIN Quality Analysis: Privacy, Security & SIRTFI Coverage ===",
-        file=sys.stderr,
-    )
-    print(
+    # Bind every counter once; the output is assembled into a single write
+    total_sps = stats["total_sps"]
+    total_idps = stats["total_idps"]
+    sps_has_privacy = stats["sps_has_privacy"]
+    idps_has_privacy = stats["idps_has_privacy"]
+    total_has_security = stats["total_has_security"]
+    total_missing_security = stats["total_missing_security"]
+    sps_has_security = stats["sps_has_security"]
+    idps_has_security = stats["idps_has_security"]
+    total_has_sirtfi = stats["total_has_sirtfi"]
+    total_missing_sirtfi = stats["total_missing_sirtfi"]
+
+    lines = [
+        "",
+        "=== eduGAIN Quality Analysis: Privacy, Security & SIRTFI Coverage ===",
         f"Total entities analyzed: {total:,} (SPs: {total_sps:,}, IdPs: {total_idps:,})",
-        file=sys.stderr,
-    )
-    print("", file=sys.stderr)
+        "",
+    ]
 
     # Privacy statement statistics - tree format (both SPs and IdPs)
-    total_privacy = stats["sps_has_privacy"] + stats["idps_has_privacy"]
+    total_privacy = sps_has_privacy + idps_has_privacy
     total_for_privacy = total_sps + total_idps
-    total_privacy_pct = (
-        (total_privacy / total_for_privacy * 100) if total_for_privacy > 0 else 0
-    )
-
-    if total_privacy_pct >= 80:
-        total_privacy_emoji = "🟢"
-    elif total_privacy_pct >= 50:
-        total_privacy_emoji = "🟡"
+    total_missing_privacy = stats["sps_missing_privacy"] + stats["idps_missing_privacy"]
+    if total_for_privacy > 0:
+        total_privacy_pct = total_privacy / total_for_privacy * 100
+        total_missing_privacy_pct = total_missing_privacy / total_for_privacy * 100
     else:
-        total_privacy_emoji = "🔴"
+        total_privacy_pct = total_missing_privacy_pct = 0
 
-    print(
-        f"📊 Privacy Statement URL Coverage: {total_privacy_emoji} {total_privacy:,}/{total_for_privacy:,} ({total_privacy_pct:.1f}%)",
-        file=sys.stderr,
+    lines.append(
+        f"📊 Privacy Statement URL Coverage: {_coverage_emoji(total_privacy_pct)} {total_privacy:,}/{total_for_privacy:,} ({total_privacy_pct:.1f}%)"
     )
-
-    # Split privacy stats by entity type with tree structure
-    if total_sps > 0 and total_idps > 0:
-        sp_privacy_pct = (stats["sps_has_privacy"] / total_sps) * 100
-        sp_privacy_emoji = (
-            "🟢" if sp_privacy_pct >= 80 else "🟡" if sp_privacy_pct >= 50 else "🔴"
-        )
-        idp_privacy_pct = (stats["idps_has_privacy"] / total_idps) * 100
-        idp_privacy_emoji = (
-            "🟢" if idp_privacy_pct >= 80 else "🟡" if idp_privacy_pct >= 50 else "🔴"
-        )
-        print(
-            f"  ├─ SPs: {sp_privacy_emoji} {stats['sps_has_privacy']:,}/{total_sps:,} ({sp_privacy_pct:.1f}%)",
-            file=sys.stderr,
-        )
-        print(
-            f"  └─ IdPs: {idp_privacy_emoji} {stats['idps_has_privacy']:,}/{total_idps:,} ({idp_privacy_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_sps > 0:
-        sp_privacy_pct = (stats["sps_has_privacy"] / total_sps) * 100
-        sp_privacy_emoji = (
-            "🟢" if sp_privacy_pct >= 80 else "🟡" if sp_privacy_pct >= 50 else "🔴"
-        )
-        print(
-            f"  └─ SPs: {sp_privacy_emoji} {stats['sps_has_privacy']:,}/{total_sps:,} ({sp_privacy_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_idps > 0:
-        idp_privacy_pct = (stats["idps_has_privacy"] / total_idps) * 100
-        idp_privacy_emoji = (
-            "🟢" if idp_privacy_pct >= 80 else "🟡" if idp_privacy_pct >= 50 else "🔴"
-        )
-        print(
-            f"  └─ IdPs: {idp_privacy_emoji} {stats['idps_has_privacy']:,}/{total_idps:,} ({idp_privacy_pct:.1f}%)",
-            file=sys.stderr,
-        )
-
-    total_missing_privacy = stats["sps_missing_privacy"] + stats["idps_missing_privacy"]
-    total_missing_privacy_pct = (
-        (total_missing_privacy / total_for_privacy * 100)
-        if total_for_privacy > 0
-        else 0
+    lines.extend(
+        _role_breakdown(sps_has_privacy, idps_has_privacy, total_sps, total_idps)
     )
-    print(
-        f"❌ Missing: {total_missing_privacy:,}/{total_for_privacy:,} ({total_missing_privacy_pct:.1f}%)",
-        file=sys.stderr,
+    lines.append(
+        f"❌ Missing: {total_missing_privacy:,}/{total_for_privacy:,} ({total_missing_privacy_pct:.1f}%)"
     )
-    print("", file=sys.stderr)
+    lines.append("")
 
     # Security contact statistics - tree format
-    total_security_pct = (stats["total_has_security"] / total) * 100
-    total_missing_security_pct = (stats["total_missing_security"] / total) * 100
-
-    # Color emoji based on percentage
-    if total_security_pct >= 80:
-        total_security_emoji = "🟢"
-    elif total_security_pct >= 50:
-        total_security_emoji = "🟡"
-    else:
-        total_security_emoji = "🔴"
-
-    print(
-        f"🔒 Security Contact Coverage: {total_security_emoji} {stats['total_has_security']:,}/{total:,} ({total_security_pct:.1f}%)",
-        file=sys.stderr,
+    total_security_pct = total_has_security / total * 100
+    total_missing_security_pct = total_missing_security / total * 100
+    lines.append(
+        f"🔒 Security Contact Coverage: {_coverage_emoji(total_security_pct)} {total_has_security:,}/{total:,} ({total_security_pct:.1f}%)"
     )
-
-    # Split security stats by entity type with tree structure
-    if total_sps > 0 and total_idps > 0:
-        sp_security_pct = (stats["sps_has_security"] / total_sps) * 100
-        sp_security_emoji = (
-            "🟢" if sp_security_pct >= 80 else "🟡" if sp_security_pct >= 50 else "🔴"
-        )
-        idp_security_pct = (stats["idps_has_security"] / total_idps) * 100
-        idp_security_emoji = (
-            "🟢" if idp_security_pct >= 80 else "🟡" if idp_security_pct >= 50 else "🔴"
-        )
-        print(
-            f"  ├─ SPs: {sp_security_emoji} {stats['sps_has_security']:,}/{total_sps:,} ({sp_security_pct:.1f}%)",
-            file=sys.stderr,
-        )
-        print(
-            f"  └─ IdPs: {idp_security_emoji} {stats['idps_has_security']:,}/{total_idps:,} ({idp_security_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_sps > 0:
-        sp_security_pct = (stats["sps_has_security"] / total_sps) * 100
-        sp_security_emoji = (
-            "🟢" if sp_security_pct >= 80 else "🟡" if sp_security_pct >= 50 else "🔴"
-        )
-        print(
-            f"  └─ SPs: {sp_security_emoji} {stats['sps_has_security']:,}/{total_sps:,} ({sp_security_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_idps > 0:
-        idp_security_pct = (stats["idps_has_security"] / total_idps) * 100
-        idp_security_emoji = (
-            "🟢" if idp_security_pct >= 80 else "🟡" if idp_security_pct >= 50 else "🔴"
-        )
-        print(
-            f"  └─ IdPs: {idp_security_emoji} {stats['idps_has_security']:,}/{total_idps:,} ({idp_security_pct:.1f}%)",
-            file=sys.stderr,
-        )
-
-    print(
-        f"❌ Missing: {stats['total_missing_security']:,}/{total:,} ({total_missing_security_pct:.1f}%)",
-        file=sys.stderr,
+    lines.extend(
+        _role_breakdown(sps_has_security, idps_has_security, total_sps, total_idps)
     )
-    print("", file=sys.stderr)
+    lines.append(
+        f"❌ Missing: {total_missing_security:,}/{total:,} ({total_missing_security_pct:.1f}%)"
+    )
+    lines.append("")
 
     # SIRTFI certification statistics - tree format
-    total_sirtfi_pct = (stats["total_has_sirtfi"] / total) * 100
-    total_missing_sirtfi_pct = (stats["total_missing_sirtfi"] / total) * 100
-
-    # Color emoji based on percentage
-    if total_sirtfi_pct >= 80:
-        total_sirtfi_emoji = "🟢"
-    elif total_sirtfi_pct >= 50:
-        total_sirtfi_emoji = "🟡"
-    else:
-        total_sirtfi_emoji = "🔴"
-
-    print(
-        f"🔰 SIRTFI Certification Coverage: {total_sirtfi_emoji} {stats['total_has_sirtfi']:,}/{total:,} ({total_sirtfi_pct:.1f}%)",
-        file=sys.stderr,
+    total_sirtfi_pct = total_has_sirtfi / total * 100
+    total_missing_sirtfi_pct = total_missing_sirtfi / total * 100
+    lines.append(
+        f"🔰 SIRTFI Certification Coverage: {_coverage_emoji(total_sirtfi_pct)} {total_has_sirtfi:,}/{total:,} ({total_sirtfi_pct:.1f}%)"
     )
-
-    # Split SIRTFI stats by entity type with tree structure
-    if total_sps > 0 and total_idps > 0:
-        sp_sirtfi_pct = (stats["sps_has_sirtfi"] / total_sps) * 100
-        sp_sirtfi_emoji = (
-            "🟢" if sp_sirtfi_pct >= 80 else "🟡" if sp_sirtfi_pct >= 50 else "🔴"
-        )
-        idp_sirtfi_pct = (stats["idps_has_sirtfi"] / total_idps) * 100
-        idp_sirtfi_emoji = (
-            "🟢" if idp_sirtfi_pct >= 80 else "🟡" if idp_sirtfi_pct >= 50 else "🔴"
-        )
-        print(
-            f"  ├─ SPs: {sp_sirtfi_emoji} {stats['sps_has_sirtfi']:,}/{total_sps:,} ({sp_sirtfi_pct:.1f}%)",
-            file=sys.stderr,
-        )
-        print(
-            f"  └─ IdPs: {idp_sirtfi_emoji} {stats['idps_has_sirtfi']:,}/{total_idps:,} ({idp_sirtfi_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_sps > 0:
-        sp_sirtfi_pct = (stats["sps_has_sirtfi"] / total_sps) * 100
-        sp_sirtfi_emoji = (
-            "🟢" if sp_sirtfi_pct >= 80 else "🟡" if sp_sirtfi_pct >= 50 else "🔴"
+    lines.extend(
+        _role_breakdown(
+            stats["sps_has_sirtfi"], stats["idps_has_sirtfi"], total_sps, total_idps
         )
-        print(
-            f"  └─ SPs: {sp_sirtfi_emoji} {stats['sps_has_sirtfi']:,}/{total_sps:,} ({sp_sirtfi_pct:.1f}%)",
-            file=sys.stderr,
-        )
-    elif total_idps > 0:
-        idp_sirtfi_pct = (stats["idps_has_sirtfi"] / total_idps) * 100
-        idp_sirtfi_emoji = (
-            "🟢" if idp_sirtfi_pct >= 80 else "🟡" if idp_sirtfi_pct >= 50 else "🔴"
-        )
-        print(
-            f"  └─ IdPs: {idp_sirtfi_emoji} {stats['idps_has_sirtfi']:,}/{total_idps:,} ({idp_sirtfi_pct:.1f}%)",
-            file=sys.stderr,
-        )
-
-    print(
-        f"❌ Missing: {stats['total_missing_sirtfi']:,}/{total:,} ({total_missing_sirtfi_pct:.1f}%)",
-        file=sys.stderr,
     )
-    print("", file=sys.stderr)
+    lines.append(
+        f"❌ Missing: {total_missing_sirtfi:,}/{total:,} ({total_missing_sirtfi_pct:.1f}%)"
+    )
+    lines.append("")
 
     # Combined statistics - SP only (since privacy is SP-only)
     if total_sps > 0:
-        sp_both_pct = (stats["sps_has_both"] / total_sps) * 100
-        sp_missing_both_pct = (stats["sps_missing_both"] / total_sps) * 100
-        sp_has_at_least_one = total_sps - stats["sps_missing_both"]
-        sp_at_least_one_pct = (sp_has_at_least_one / total_sps) * 100
-
-        print("📈 Combined Coverage Summary (SPs only):", file=sys.stderr)
-        print(
-            f"  🌟 SPs with BOTH privacy & security: {stats['sps_has_both']:,} out of {total_sps:,} ({sp_both_pct:.1f}%)",
-            file=sys.stderr,
-        )
-        print(
-            f"  ⚡ SPs with AT LEAST ONE (privacy or security): {sp_has_at_least_one:,} out of {total_sps:,} ({sp_at_least_one_pct:.1f}%)",
-            file=sys.stderr,
-        )
-        print(
-            f"  ❌ SPs missing BOTH privacy & security: {stats['sps_missing_both']:,} out of {total_sps:,} ({sp_missing_both_pct:.1f}%)",
-            file=sys.stderr,
+        sps_has_both = stats["sps_has_both"]
+        sps_missing_both = stats["sps_missing_both"]
+        sp_both_pct = sps_has_both / total_sps * 100
+        sp_missing_both_pct = sps_missing_both / total_sps * 100
+        sp_has_at_least_one = total_sps - sps_missing_both
+        sp_at_least_one_pct = sp_has_at_least_one / total_sps * 100
+
+        lines.extend(
+            [
+                "📈 Combined Coverage Summary (SPs only):",
+                f"  🌟 SPs with BOTH privacy & security: {sps_has_both:,} out of {total_sps:,} ({sp_both_pct:.1f}%)",
+                f"  ⚡ SPs with AT LEAST ONE (privacy or security): {sp_has_at_least_one:,} out of {total_sps:,} ({sp_at_least_one_pct:.1f}%)",
+                f"  ❌ SPs missing BOTH privacy & security: {sps_missing_both:,} out of {total_sps:,} ({sp_missing_both_pct:.1f}%)",
+                "",
+            ]
         )
-        print("", file=sys.stderr)
 
     # Key insights for both entity types
-    print("💡 Key Insights:", file=sys.stderr)
+    lines.append("💡 Key Insights:")
 
     # SP insights
     if total_sps > 0:
-        print(
-            f"  • {sp_at_least_one_pct:.1f}% of SPs provide at least basic compliance",
-            file=sys.stderr,
+        lines.append(
+            f"  • {sp_at_least_one_pct:.1f}% of SPs provide at least basic compliance"
         )
-        print(
-            f"  • {sp_both_pct:.1f}% of SPs achieve full compliance (security contact + privacy statement)",
-            file=sys.stderr,
+        lines.append(
+            f"  • {sp_both_pct:.1f}% of SPs achieve full compliance (security contact + privacy statement)"
         )
 
     # IdP insights
     if total_idps > 0:
-        idp_privacy_pct = (stats["idps_has_privacy"] / total_idps) * 100
-        print(
-            f"  • {idp_privacy_pct:.1f}% of IdPs have privacy statements",
-            file=sys.stderr,
+        lines.append(
+            f"  • {idps_has_privacy / total_idps * 100:.1f}% of IdPs have privacy statements"
         )
-        print(
-            f"  • {idp_security_pct:.1f}% of IdPs have security contacts",
-            file=sys.stderr,
+        lines.append(
+            f"  • {idps_has_security / total_idps * 100:.1f}% of IdPs have security contacts"
         )
 
-    print("", file=sys.stderr)
+    lines.append("")
 
     # Privacy URL Accessibility Check (if enabled)
     if stats.get("validation_enabled", False):
         urls_checked = stats["urls_checked"]
         if urls_checked > 0:
-            print("🔗 Privacy Statement URL Check:", file=sys.stderr)
-            print(
-                f"  📊 Checked {urls_checked:,} privacy statement links",
-                file=sys.stderr,
-            )
-            print("", file=sys.stderr)
-
-            # Simple accessibility summary
-            accessibility_pct = (stats["urls_accessible"] / urls_checked) * 100
-            broken_pct = (stats["urls_broken"] / urls_checked) * 100
+            urls_accessible = stats["urls_accessible"]
+            urls_broken = stats["urls_broken"]
+            accessibility_pct = urls_accessible / urls_checked * 100
+            broken_pct = urls_broken / urls_checked * 100
 
-            print(
-                f"  ✅ {stats['urls_accessible']:,} links working ({accessibility_pct:.1f}%)",
-                file=sys.stderr,
-            )
-            print(
-                f"  ❌ {stats['urls_broken']:,} links broken ({broken_pct:.1f}%)",
-                file=sys.stderr,
+            lines.extend(
+                [
+                    "🔗 Privacy Statement URL Check:",
+                    f"  📊 Checked {urls_checked:,} privacy statement links",
+                    "",
+                    f"  ✅ {urls_accessible:,} links working ({accessibility_pct:.1f}%)",
+                    f"  ❌ {urls_broken:,} links broken ({broken_pct:.1f}%)",
+                    "",
+                ]
             )
-            print("", file=sys.stderr)
 
     # Content quality section
     if stats.get("content_validation_enabled", False):
         content_checked = stats.get("content_urls_checked", 0)
         if content_checked > 0:
             scores = stats.get("content_quality_scores", [])
-            print("\n📊 Privacy Page Content Quality Analysis:", file=sys.stderr)
-            print(f"  Analysed: {content_checked:,} pages", file=sys.stderr)
+            lines.append("")
+            lines.append("📊 Privacy Page Content Quality Analysis:")
+            lines.append(f"  Analysed: {content_checked:,} pages")
 
             if scores:
                 avg_score = sum(scores) / len(scores)
@@ -310,46 +193,32 @@ def print_summary(stats: dict) -> None:
                 poor = sum(1 for s in scores if 30 <= s < 50)
                 broken = sum(1 for s in scores if s < 30)
 
-                print(f"  Average score: {avg_score:.0f}/100", file=sys.stderr)
-                print(
-                    f"  🟢 Excellent (90-100): {excellent:,} "
-                    f"({excellent / content_checked * 100:.0f}%)",
-                    file=sys.stderr,
-                )
-                print(
-                    f"  🟡 Good (70-89): {good:,} "
-                    f"({good / content_checked * 100:.0f}%)",
-                    file=sys.stderr,
-                )
-                print(
-                    f"  🟠 Fair (50-69): {fair:,} "
-                    f"({fair / content_checked * 100:.0f}%)",
-                    file=sys.stderr,
-                )
-                print(
-                    f"  🔴 Poor (30-49): {poor:,} "
-                    f"({poor / content_checked * 100:.0f}%)",
-                    file=sys.stderr,
-                )
-                print(
-                    f"  💀 Broken (0-29): {broken:,} "
-                    f"({broken / content_checked * 100:.0f}%)",
-                    file=sys.stderr,
-                )
+                lines.append(f"  Average score: {avg_score:.0f}/100")
+                for label, count in (
+                    ("🟢 Excellent (90-100)", excellent),
+                    ("🟡 Good (70-89)", good),
+                    ("🟠 Fair (50-69)", fair),
+                    ("🔴 Poor (30-49)", poor),
+                    ("💀 Broken (0-29)", broken),
+                ):
+                    lines.append(
+                        f"  {label}: {count:,} ({count / content_checked * 100:.0f}%)"
+                    )
 
             issues = stats.get("content_quality_issues_breakdown", {})
             if issues:
                 sorted_issues = sorted(issues.items(), key=lambda x: x[1], reverse=True)
-                print("  Top quality issues:", file=sys.stderr)
+                lines.append("  Top quality issues:")
                 for issue, count in sorted_issues[:5]:
                     pct = count / content_checked * 100
-                    print(f"    • {issue}: {count:,} ({pct:.0f}%)", file=sys.stderr)
+                    lines.append(f"    • {issue}: {count:,} ({pct:.0f}%)")
 
-    print(
-        "💡 For detailed entity lists, federation reports, or CSV exports, use --help to see all options.",
-        file=sys.stderr,
+    lines.append(
+        "💡 For detailed entity lists, federation reports, or CSV exports, use --help to see all options."
     )
 
+    sys.stderr.write("\n".join(lines) + "\n")
+
 
 def print_summary_markdown(stats: dict, output_file=sys.stderr) -> None:
     """Print main summary statistics in markdown format."""
@@ -912,9 +781,12 @@ def print_federation_summary(federation_stats: dict, output_file=sys.stderr) ->
         print("", file=output_file)
 
 
-def export_federation_csv(federation_stats: dict, include_headers: bool = True) -> None:
-    """Export federation statistics to CSV format."""
-    writer = csv.writer(sys.stdout)
+def export_federation_csv(
+    federation_stats: dict, include_headers: bool = True, output_file=None
+) -> None:
+    """Export federation statistics to CSV format (stdout unless output_file is given)."""
+    # Resolved per call so a redirected sys.stdout is honoured
+    writer = csv.writer(sys.stdout if output_file is None else output_file)
 
     # CSV headers - check if validation was enabled for any federation
     validation_enabled = any(
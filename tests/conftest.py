@@ -1,13 +1,31 @@
 """Pytest configuration and shared fixtures."""
 
+import cProfile
+import re
 import sys
 from pathlib import Path
 
 import pytest
+from lxml import etree
 
-# Add src to path for testing
+# Add src to path for testing, once for the whole session
 src_path = Path(__file__).parent.parent / "src"
-sys.path.insert(0, str(src_path))
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from edugain_analysis.core.metadata import iter_entities  # noqa: E402
+
+PROFILE_DIR = Path(__file__).parent.parent / "artifacts" / "profiles"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Register the opt-in per-test profiling flag."""
+    parser.addoption(
+        "--profile",
+        action="store_true",
+        default=False,
+        help=f"Write a cProfile .prof file per test to {PROFILE_DIR}",
+    )
 
 
 def pytest_sessionstart(session: pytest.Session) -> None:
@@ -19,9 +37,27 @@ def pytest_sessionstart(session: pytest.Session) -> None:
         )
 
 
-@pytest.fixture
+@pytest.fixture(autouse=True)
+def _profile(request: pytest.FixtureRequest):
+    """Profile the test body when --profile is given; a no-op otherwise."""
+    if not request.config.getoption("--profile"):
+        yield
+        return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        name = re.sub(r"[^\w.-]+", "_", request.node.nodeid)
+        profiler.dump_stats(PROFILE_DIR / f"{name}.prof")
+
+
+@pytest.fixture(scope="session")
 def sample_metadata_xml():
-    """Sample metadata XML for testing."""
+    """Sample metadata XML for testing (an immutable string, so shared)."""
     return """<?xml version="1.0" encoding="UTF-8"?>
 <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
     <md:EntityDescriptor entityID="https://example.edu/sp">
@@ -44,6 +80,24 @@ def sample_metadata_xml():
 </md:EntitiesDescriptor>"""
 
 
+@pytest.fixture(params=["tree", "stream"])
+def metadata_source(request):
+    """
+    Turn metadata XML text into analyze_entities() input.
+
+    Each test runs twice: once on a parsed root element and once on the
+    EntityDescriptor stream that the CLI entry points produce in production.
+    """
+
+    def _source(xml_content: str):
+        content = xml_content.encode()
+        if request.param == "tree":
+            return etree.fromstring(content)
+        return iter_entities(content)
+
+    return _source
+
+
 @pytest.fixture
 def temp_cache_dir(tmp_path):
     """Temporary cache directory for testing."""
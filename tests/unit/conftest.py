@@ -0,0 +1,28 @@
+"""Fixtures shared by the CSV CLI entry point tests."""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+
+@pytest.fixture
+def cli_mocks(monkeypatch, cli_module):
+    """Replace metadata loading and analysis in cli_module.main() with mocks."""
+    mocks = SimpleNamespace(load=MagicMock(), analyze=MagicMock())
+    mocks.analyze.return_value = [("reg_auth", "SP", "Org", "entity_id")]
+    monkeypatch.setattr("edugain_analysis.cli.utils.load_metadata_for_cli", mocks.load)
+    monkeypatch.setattr(cli_module, "analyze_entities", mocks.analyze)
+    return mocks
+
+
+@pytest.fixture
+def run_main(monkeypatch, capsys, cli_module):
+    """Run cli_module.main() with the given arguments and return its stdout."""
+
+    def _run(*args):
+        monkeypatch.setattr("sys.argv", [cli_module.__name__.rpartition(".")[2], *args])
+        cli_module.main()
+        return capsys.readouterr().out
+
+    return _run
@@ -1,15 +1,8 @@
 """Tests for cli/broken_privacy.py functionality."""
 
-import os
-import sys
-import xml.etree.ElementTree as ET
-from io import StringIO
 from unittest.mock import patch
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
+from lxml import etree
 
 from edugain_analysis.cli.broken_privacy import (
     EDUGAIN_METADATA_URL,
@@ -39,16 +32,18 @@ class TestDownloadMetadata:
 
     @patch("edugain_analysis.cli.broken_privacy.get_metadata")
     @patch("sys.exit")
-    def test_download_metadata_request_exception(self, mock_exit, mock_get_metadata):
+    def test_download_metadata_request_exception(
+        self, mock_exit, mock_get_metadata, capsys
+    ):
         """Test download metadata with request exception."""
         mock_get_metadata.side_effect = RuntimeError("Network error")
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            download_metadata("https://example.org/metadata")
+        download_metadata("https://example.org/metadata")
 
         mock_exit.assert_called_once_with(1)
-        assert "Error downloading metadata" in mock_stderr.getvalue()
-        assert "Network error" in mock_stderr.getvalue()
+        stderr_output = capsys.readouterr().err
+        assert "Error downloading metadata" in stderr_output
+        assert "Network error" in stderr_output
 
 
 class TestGetFederationMapping:
@@ -71,15 +66,14 @@ class TestGetFederationMapping:
         mock_core_mapping.assert_called_once()
 
     @patch("edugain_analysis.cli.broken_privacy.core_get_federation_mapping")
-    def test_get_federation_mapping_error(self, mock_core_mapping):
+    def test_get_federation_mapping_error(self, mock_core_mapping, capsys):
         """Test federation mapping with request error."""
         mock_core_mapping.side_effect = RuntimeError("API error")
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            result = get_federation_mapping()
+        result = get_federation_mapping()
 
         assert result == {}
-        assert "Warning: Could not fetch federation mapping" in mock_stderr.getvalue()
+        assert "Warning: Could not fetch federation mapping" in capsys.readouterr().err
 
     @patch("edugain_analysis.cli.broken_privacy.core_get_federation_mapping")
     def test_get_federation_mapping_partial_data(self, mock_core_mapping):
@@ -252,7 +246,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 1
@@ -279,7 +273,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 0
@@ -300,7 +294,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 0
@@ -325,7 +319,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 0
@@ -350,7 +344,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 0
@@ -375,7 +369,7 @@ class TestCollectSPPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 0
@@ -424,15 +418,16 @@ class TestCollectEntityPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         # Should have both SP and IdP
         assert len(result) == 2
 
+        by_entity_id = {e[2]: e for e in result}
+
         # Check SP entry
-        sp_entry = [e for e in result if e[2] == "https://example.org/sp"][0]
-        assert sp_entry == (
+        assert by_entity_id["https://example.org/sp"] == (
             "https://example.org",
             "Example SP",
             "https://example.org/sp",
@@ -440,8 +435,7 @@ class TestCollectEntityPrivacyURLs:
         )
 
         # Check IdP entry
-        idp_entry = [e for e in result if e[2] == "https://example.org/idp"][0]
-        assert idp_entry == (
+        assert by_entity_id["https://example.org/idp"] == (
             "https://example.org",
             "Example IdP",
             "https://example.org/idp",
@@ -471,7 +465,7 @@ class TestCollectEntityPrivacyURLs:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         result = collect_entity_privacy_urls(root)
 
         assert len(result) == 1
@@ -525,8 +519,7 @@ class TestValidatePrivacyURLs:
             },
         }
 
-        with patch("sys.stderr", new_callable=StringIO):
-            result = validate_privacy_urls(sp_data, max_workers=2)
+        result = validate_privacy_urls(sp_data, max_workers=2)
 
         # Should only validate 2 unique URLs
         assert len(result) == 2
@@ -534,7 +527,7 @@ class TestValidatePrivacyURLs:
         assert "https://privacy2.org" in result
         mock_validate_parallel.assert_called_once()
         args, _ = mock_validate_parallel.call_args
-        assert set(args[0]) == {"https://privacy1.org", "https://privacy2.org"}
+        assert args[0] == ["https://privacy1.org", "https://privacy2.org"]
 
     @patch("edugain_analysis.cli.broken_privacy.validate_urls_parallel")
     def test_validate_privacy_urls_with_errors(self, mock_validate_parallel):
@@ -557,8 +550,7 @@ class TestValidatePrivacyURLs:
             }
         }
 
-        with patch("sys.stderr", new_callable=StringIO):
-            result = validate_privacy_urls(sp_data, max_workers=1)
+        result = validate_privacy_urls(sp_data, max_workers=1)
 
         # Should still return result with error
         assert len(result) == 1
@@ -713,7 +705,7 @@ class TestMain:
     @patch("edugain_analysis.cli.broken_privacy.validate_privacy_urls")
     @patch("sys.argv", ["broken_privacy.py"])
     def test_main_default_options(
-        self, mock_validate, mock_get_federation, mock_load_metadata
+        self, mock_validate, mock_get_federation, mock_load_metadata, capsys
     ):
         """Test main with default options."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
@@ -737,7 +729,7 @@ class TestMain:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        mock_load_metadata.return_value = ET.fromstring(xml_content)
+        mock_load_metadata.return_value = etree.fromstring(xml_content.encode())
         mock_get_federation.return_value = {"https://example.org": "Example Federation"}
         mock_validate.return_value = {
             "https://example.org/privacy": {
@@ -748,11 +740,9 @@ class TestMain:
             }
         }
 
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            with patch("sys.stderr", new_callable=StringIO):
-                main()
+        main()
 
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         assert "Federation" in output
         assert "Example Federation" in output
         mock_load_metadata.assert_called_once_with(
@@ -767,14 +757,12 @@ class TestMain:
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"/>"""
 
-        mock_load.return_value = ET.fromstring(xml_content)
+        mock_load.return_value = etree.fromstring(xml_content.encode())
         mock_get_federation.return_value = {}
         mock_validate.return_value = {}
 
         with patch("sys.argv", ["broken_privacy.py", "--local-file", "test.xml"]):
-            with patch("sys.stdout", new_callable=StringIO):
-                with patch("sys.stderr", new_callable=StringIO):
-                    main()
+            main()
 
         mock_load.assert_called_once_with("test.xml", None, EDUGAIN_METADATA_URL, 30)
 
@@ -782,20 +770,20 @@ class TestMain:
     @patch("edugain_analysis.cli.broken_privacy.get_federation_mapping")
     @patch("edugain_analysis.cli.broken_privacy.validate_privacy_urls")
     @patch("sys.argv", ["broken_privacy.py", "--no-headers"])
-    def test_main_no_headers(self, mock_validate, mock_get_federation, mock_load):
+    def test_main_no_headers(
+        self, mock_validate, mock_get_federation, mock_load, capsys
+    ):
         """Test main with --no-headers option."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"/>"""
 
-        mock_load.return_value = ET.fromstring(xml_content)
+        mock_load.return_value = etree.fromstring(xml_content.encode())
         mock_get_federation.return_value = {}
         mock_validate.return_value = {}
 
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            with patch("sys.stderr", new_callable=StringIO):
-                main()
+        main()
 
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         assert "Federation" not in output
 
     @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
@@ -807,13 +795,11 @@ class TestMain:
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"/>"""
 
-        mock_load.return_value = ET.fromstring(xml_content)
+        mock_load.return_value = etree.fromstring(xml_content.encode())
         mock_get_federation.return_value = {}
         mock_validate.return_value = {}
 
-        with patch("sys.stdout", new_callable=StringIO):
-            with patch("sys.stderr", new_callable=StringIO):
-                main()
+        main()
 
         mock_load.assert_called_once_with(
             None, "https://custom.url/metadata", EDUGAIN_METADATA_URL, 30
@@ -823,8 +809,7 @@ class TestMain:
     @patch("sys.exit")
     def test_main_help_option(self, mock_exit):
         """Test main with --help option."""
-        with patch("sys.stdout", new_callable=StringIO):
-            main()
+        main()
 
         # argparse calls sys.exit(0) after printing help
         mock_exit.assert_called_once_with(0)
@@ -832,27 +817,25 @@ class TestMain:
     @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
     @patch("sys.exit")
     @patch("sys.argv", ["broken_privacy.py", "--local-file", "/tmp/invalid.xml"])
-    def test_main_xml_parse_error_local_file(self, mock_exit, mock_load):
+    def test_main_xml_parse_error_local_file(self, mock_exit, mock_load, capsys):
         """Test main with XML parse error from local file."""
-        mock_load.side_effect = ET.ParseError("Invalid XML")
+        mock_load.side_effect = etree.ParseError("Invalid XML", 0, 1, 1)
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            main()
+        main()
 
         mock_exit.assert_called_once_with(1)
-        assert "Error loading metadata" in mock_stderr.getvalue()
+        assert "Error loading metadata" in capsys.readouterr().err
 
     @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
     @patch("sys.exit")
     @patch("sys.argv", ["broken_privacy.py"])
-    def test_main_xml_parse_error_downloaded(self, mock_exit, mock_load):
+    def test_main_xml_parse_error_downloaded(self, mock_exit, mock_load, capsys):
         """Test main with XML parse error from downloaded content."""
-        mock_load.side_effect = ET.ParseError("Invalid XML")
+        mock_load.side_effect = etree.ParseError("Invalid XML", 0, 1, 1)
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            main()
+        main()
 
         # Should exit with error
         mock_exit.assert_called_once_with(1)
-        stderr_output = mock_stderr.getvalue()
+        stderr_output = capsys.readouterr().err
         assert "Error loading metadata" in stderr_output
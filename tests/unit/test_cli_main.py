@@ -1,392 +1,237 @@
 """Tests for CLI main functionality."""
 
-import os
 import sys
-from io import StringIO
-from unittest.mock import MagicMock, patch
+from types import SimpleNamespace
+from unittest.mock import MagicMock
 
 import pytest
+from lxml import etree
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+from edugain_analysis.cli.main import main, setup_argument_parser
+from edugain_analysis.config import (
+    EDUGAIN_METADATA_URL,
+    ENTITY_DESCRIPTOR_TAG,
+    NAMESPACES,
 )
+from edugain_analysis.core import analyze_privacy_security, iter_entities
 
-from edugain_analysis.cli.main import main
+# cli/__init__ re-exports main(), which shadows the module attribute
+CLI_MAIN = sys.modules["edugain_analysis.cli.main"]
+
+# Opaque stand-in for iter_entities() output; the mocked analysis never reads it
+PARSED_ENTITIES = object()
+
+
+@pytest.fixture(scope="module")
+def tiny_metadata_bytes():
+    """Serialized metadata with one SP per federation, built once per module."""
+    md = NAMESPACES["md"]
+    root = etree.Element(f"{{{md}}}EntitiesDescriptor", nsmap=NAMESPACES)
+    for index, authority in enumerate(
+        ["https://incommon.org", "https://www.surfconext.nl", "https://incommon.org"]
+    ):
+        entity = etree.SubElement(
+            root, ENTITY_DESCRIPTOR_TAG, entityID=f"https://sp{index}.test.org"
+        )
+        extensions = etree.SubElement(entity, f"{{{md}}}Extensions")
+        etree.SubElement(
+            extensions,
+            f"{{{NAMESPACES['mdrpi']}}}RegistrationInfo",
+            registrationAuthority=authority,
+        )
+        etree.SubElement(entity, f"{{{md}}}SPSSODescriptor")
+        organization = etree.SubElement(entity, f"{{{md}}}Organization")
+        etree.SubElement(
+            organization, f"{{{md}}}OrganizationDisplayName"
+        ).text = f"Test Org {index}"
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8")
+
+
+@pytest.fixture
+def mock_main(monkeypatch):
+    """Return a helper that replaces a collaborator of main() with a MagicMock."""
+
+    def _mock(name, **kwargs):
+        mock = MagicMock(**kwargs)
+        monkeypatch.setattr(CLI_MAIN, name, mock)
+        return mock
+
+    return _mock
+
+
+@pytest.fixture
+def run_analyze(monkeypatch):
+    """Run main() as `analyze.py` with the given command line arguments."""
+
+    def _run(*args):
+        monkeypatch.setattr("sys.argv", ["analyze.py", *args])
+        main()
+
+    return _run
+
+
+@pytest.fixture
+def pipeline(mock_main):
+    """Replace the download, parse and analysis steps behind main() with mocks."""
+    return SimpleNamespace(
+        federation_mapping=mock_main("get_federation_mapping", return_value={}),
+        get_metadata=mock_main("get_metadata", return_value=b"<xml>metadata</xml>"),
+        iter_entities=mock_main("iter_entities", return_value=PARSED_ENTITIES),
+        stream_entities=mock_main("stream_entities", return_value=PARSED_ENTITIES),
+        analyze=mock_main("analyze_privacy_security"),
+    )
+
+
+@pytest.fixture
+def tiny_pipeline(pipeline, tiny_metadata_bytes):
+    """Run the real parse and analysis steps on the tiny metadata document."""
+    pipeline.federation_mapping.return_value = {"https://incommon.org": "InCommon"}
+    pipeline.get_metadata.return_value = tiny_metadata_bytes
+    pipeline.iter_entities.side_effect = iter_entities
+    pipeline.analyze.side_effect = analyze_privacy_security
+    return pipeline
 
 
 class TestCLIMain:
     """Test the main CLI function."""
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_main_default_summary(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_default_summary(self, tiny_pipeline, mock_main, run_analyze):
         """Test main function with default summary output."""
-        # Mock return values
-        mock_get_federation.return_value = {"https://incommon.org": "InCommon"}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = ([], {"total_entities": 100}, {})
+        mock_print_summary = mock_main("print_summary")
 
         # Test with default arguments (summary)
-        with patch("sys.argv", ["analyze.py"]):
-            main()
+        run_analyze()
 
         # Verify function calls
-        mock_get_federation.assert_called_once()
-        mock_get_metadata.assert_called_once()
-        mock_parse.assert_called_once()
-        mock_analyze.assert_called_once()
+        tiny_pipeline.federation_mapping.assert_called_once()
+        tiny_pipeline.get_metadata.assert_called_once()
         mock_print_summary.assert_called_once()
+        stats = mock_print_summary.call_args[0][0]
+        assert stats["total_entities"] == 3
+        assert stats["total_sps"] == 3
+        assert stats["sps_missing_privacy"] == 3
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary_markdown")
-    @patch("edugain_analysis.cli.main.print_federation_summary")
-    def test_main_report_option(
-        self,
-        mock_print_federation,
-        mock_print_markdown,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_report_option(self, pipeline, mock_main, run_analyze):
         """Test main function with --report option."""
-        # Mock return values
-        mock_get_federation.return_value = {"https://incommon.org": "InCommon"}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = ([], {"total_entities": 100}, {"InCommon": {}})
+        mock_print_markdown = mock_main("print_summary_markdown")
+        mock_print_federation = mock_main("print_federation_summary")
+        pipeline.federation_mapping.return_value = {"https://incommon.org": "InCommon"}
+        pipeline.analyze.return_value = ([], {"total_entities": 100}, {"InCommon": {}})
 
-        with patch("sys.argv", ["analyze.py", "--report"]):
-            main()
+        run_analyze("--report")
 
         # Should call both markdown report functions
         mock_print_markdown.assert_called_once()
         mock_print_federation.assert_called_once()
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_main_validate_option(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_validate_option(self, pipeline, mock_main, run_analyze):
         """Test main function with --validate option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = (
+        mock_main("print_summary")
+        pipeline.analyze.return_value = (
             [],
             {"total_entities": 100, "validation_enabled": True},
             {},
         )
 
-        with patch("sys.argv", ["analyze.py", "--validate"]):
-            main()
+        run_analyze("--validate")
 
         # Should call analyze with validation enabled
-        args, kwargs = mock_analyze.call_args
+        args, kwargs = pipeline.analyze.call_args
         # Third positional argument should be validate_urls=True
         assert args[2] is True
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_entities(
-        self,
-        mock_stdout,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_csv_entities(self, tiny_pipeline, run_analyze, capsys):
         """Test main function with --csv entities option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
+        run_analyze("--csv", "entities")
 
-        # Mock entity data
-        entities_list = [
-            [
-                "InCommon",
-                "SP",
-                "Test Org",
-                "https://test.org",
-                "Yes",
-                "https://test.org/privacy",
-                "No",
-            ]
-        ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
-
-        with patch("sys.argv", ["analyze.py", "--csv", "entities"]):
-            main()
-
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         # Should output CSV with headers
         assert "Federation,EntityType,OrganizationName" in output
-        assert "InCommon,SP,Test Org" in output
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.export_federation_csv")
-    def test_main_csv_federations(
-        self,
-        mock_export_csv,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+        assert "InCommon,SP,Test Org 0,https://sp0.test.org,No,,No,No" in output
+        assert output.count("\n") == 4
+
+    def test_main_csv_federations(self, pipeline, mock_main, run_analyze):
         """Test main function with --csv federations option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = ([], {"total_entities": 1}, {"InCommon": {}})
+        mock_export_csv = mock_main("export_federation_csv")
+        pipeline.analyze.return_value = ([], {"total_entities": 1}, {"InCommon": {}})
 
-        with patch("sys.argv", ["analyze.py", "--csv", "federations"]):
-            main()
+        run_analyze("--csv", "federations")
 
         # Should call export_federation_csv
         mock_export_csv.assert_called_once()
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.filter_entities")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_missing_privacy(
-        self,
-        mock_stdout,
-        mock_filter,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
+    @pytest.mark.parametrize(
+        "csv_option,filter_mode",
+        [
+            ("missing-privacy", "missing_privacy"),
+            ("missing-security", "missing_security"),
+            ("missing-both", "missing_both"),
+        ],
+    )
+    def test_main_csv_missing(
+        self, pipeline, mock_main, run_analyze, csv_option, filter_mode
     ):
-        """Test main function with --csv missing-privacy option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-
+        """Test main function with the --csv missing-* options."""
         entities_list = [
-            ["InCommon", "SP", "Test Org", "https://test.org", "No", "", "Yes"]
+            ["InCommon", "SP", "Test Org", "https://test.org", "No", "", "No"]
         ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
-        mock_filter.return_value = entities_list
+        pipeline.analyze.return_value = (entities_list, {"total_entities": 1}, {})
+        mock_filter = mock_main("filter_entities", return_value=entities_list)
 
-        with patch("sys.argv", ["analyze.py", "--csv", "missing-privacy"]):
-            main()
+        run_analyze("--csv", csv_option)
 
         # Should call filter_entities with correct mode
-        mock_filter.assert_called_once_with(entities_list, "missing_privacy")
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.filter_entities")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_missing_security(
-        self,
-        mock_stdout,
-        mock_filter,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
-        """Test main function with --csv missing-security option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
+        mock_filter.assert_called_once_with(entities_list, filter_mode)
+        assert pipeline.analyze.call_args.args[0] is PARSED_ENTITIES
 
-        entities_list = [
-            [
-                "InCommon",
-                "SP",
-                "Test Org",
-                "https://test.org",
-                "Yes",
-                "https://test.org/privacy",
-                "No",
-            ]
-        ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
-        mock_filter.return_value = entities_list
+    def test_main_local_file(self, pipeline, mock_main, run_analyze):
+        """Test main function with local file source."""
+        mock_main("print_summary")
+        pipeline.analyze.return_value = ([], {"total_entities": 100}, {})
 
-        with patch("sys.argv", ["analyze.py", "--csv", "missing-security"]):
-            main()
+        run_analyze("--source", "/path/to/metadata.xml")
 
-        # Should call filter_entities with correct mode
-        mock_filter.assert_called_once_with(entities_list, "missing_security")
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.filter_entities")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_missing_both(
-        self,
-        mock_stdout,
-        mock_filter,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
-        """Test main function with --csv missing-both option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
+        # Should call iter_entities with local file
+        args, kwargs = pipeline.iter_entities.call_args
+        assert args[1] == "/path/to/metadata.xml"
+        pipeline.get_metadata.assert_not_called()
 
-        entities_list = [
-            ["InCommon", "SP", "Test Org", "https://test.org", "No", "", "No"]
-        ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
-        mock_filter.return_value = entities_list
+    def test_main_custom_url(self, pipeline, mock_main, run_analyze):
+        """Test main function with custom URL source."""
+        mock_main("print_summary")
+        pipeline.analyze.return_value = ([], {"total_entities": 100}, {})
 
-        with patch("sys.argv", ["analyze.py", "--csv", "missing-both"]):
-            main()
+        run_analyze("--source", "https://custom.url/metadata.xml")
 
-        # Should call filter_entities with correct mode
-        mock_filter.assert_called_once_with(entities_list, "missing_both")
+        # Custom URLs bypass the cache and are parsed while downloading
+        pipeline.stream_entities.assert_called_once_with(
+            "https://custom.url/metadata.xml"
+        )
+        pipeline.get_metadata.assert_not_called()
+        assert pipeline.analyze.call_args.args[0] is PARSED_ENTITIES
 
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_main_local_file(self, mock_print_summary, mock_analyze, mock_parse):
-        """Test main function with local file source."""
-        # Mock return values
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = ([], {"total_entities": 100}, {})
+    def test_main_default_url_source_uses_cache(self, pipeline, mock_main, run_analyze):
+        """Test that --source with the eduGAIN feed URL keeps using the cache."""
+        mock_main("print_summary")
+        pipeline.analyze.return_value = ([], {"total_entities": 100}, {})
 
-        with patch("sys.argv", ["analyze.py", "--source", "/path/to/metadata.xml"]):
-            main()
+        run_analyze("--source", EDUGAIN_METADATA_URL)
 
-        # Should call parse_metadata with local file
-        args, kwargs = mock_parse.call_args
-        assert args[1] == "/path/to/metadata.xml"
+        pipeline.get_metadata.assert_called_once_with(EDUGAIN_METADATA_URL)
+        pipeline.iter_entities.assert_called_once_with(b"<xml>metadata</xml>")
+        pipeline.stream_entities.assert_not_called()
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_main_custom_url(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
-        """Test main function with custom URL source."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = ([], {"total_entities": 100}, {})
-
-        with patch(
-            "sys.argv", ["analyze.py", "--source", "https://custom.url/metadata.xml"]
-        ):
-            main()
-
-        # Should call get_metadata with custom URL
-        mock_get_metadata.assert_called_once_with("https://custom.url/metadata.xml")
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_no_headers(
-        self,
-        mock_stdout,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_no_headers(self, tiny_pipeline, run_analyze, capsys):
         """Test main function with --no-headers option."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-
-        entities_list = [
-            [
-                "InCommon",
-                "SP",
-                "Test Org",
-                "https://test.org",
-                "Yes",
-                "https://test.org/privacy",
-                "No",
-            ]
-        ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
-
-        with patch("sys.argv", ["analyze.py", "--csv", "entities", "--no-headers"]):
-            main()
+        run_analyze("--csv", "entities", "--no-headers")
 
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         # Should not include CSV headers
         assert "Federation,EntityType,OrganizationName" not in output
-        assert "InCommon,SP,Test Org" in output
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_urls_validated(
-        self,
-        mock_stdout,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
-        """Test main function with --csv urls-validated option (auto-enables validation)."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
+        assert output.startswith("InCommon,SP,Test Org 0")
 
+    def test_main_csv_urls_validated(self, pipeline, run_analyze, capsys):
+        """Test main function with --csv urls-validated option (auto-enables validation)."""
         # Mock extended entity data with validation
         entities_list = [
             [
@@ -404,46 +249,28 @@ class TestCLIMain:
                 "",
             ]
         ]
-        mock_analyze.return_value = (
+        pipeline.analyze.return_value = (
             entities_list,
             {"total_entities": 1, "validation_enabled": True},
             {},
         )
 
-        with patch("sys.argv", ["analyze.py", "--csv", "urls-validated"]):
-            main()
+        run_analyze("--csv", "urls-validated")
 
         # Should call analyze with validation enabled
-        args, kwargs = mock_analyze.call_args
+        args, kwargs = pipeline.analyze.call_args
         # Third positional argument should be validate_urls=True
         assert args[2] is True
 
         # Should output extended CSV format
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         assert (
             "URLStatusCode,FinalURL,URLAccessible,RedirectCount,ValidationError"
             in output
         )
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_main_csv_urls_basic(
-        self,
-        mock_stdout,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
+    def test_main_csv_urls_basic(self, pipeline, run_analyze, capsys):
         """Test main function with --csv urls option (basic URL list)."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-
         entities_list = [
             [
                 "InCommon",
@@ -455,164 +282,87 @@ class TestCLIMain:
                 "No",
             ]
         ]
-        mock_analyze.return_value = (entities_list, {"total_entities": 1}, {})
+        pipeline.analyze.return_value = (entities_list, {"total_entities": 1}, {})
 
-        with patch("sys.argv", ["analyze.py", "--csv", "urls"]):
-            main()
+        run_analyze("--csv", "urls")
 
         # Should not enable validation for basic URL list
-        args, kwargs = mock_analyze.call_args
+        args, kwargs = pipeline.analyze.call_args
         # Third positional argument should be validate_urls=False
         assert args[2] is False
 
         # Should output basic URL list
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         assert "Federation,EntityType,OrganizationName" in output
         assert (
             "StatusCode,FinalURL,URLAccessible" not in output
         )  # No validation columns
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.load_url_validation_cache")
-    @patch("edugain_analysis.cli.main.save_url_validation_cache")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_main_validation_cache_handling(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_save_cache,
-        mock_load_cache,
-        mock_get_federation,
-    ):
+    def test_main_validation_cache_handling(self, pipeline, mock_main, run_analyze):
         """Test main function handles validation cache correctly."""
-        # Mock return values
-        mock_get_federation.return_value = {}
-        mock_load_cache.return_value = {"https://test.org": {"accessible": True}}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = (
+        mock_main("print_summary")
+        mock_save_cache = mock_main("save_url_validation_cache")
+        mock_load_cache = mock_main(
+            "load_url_validation_cache",
+            return_value={"https://test.org": {"accessible": True}},
+        )
+        pipeline.analyze.return_value = (
             [],
             {"total_entities": 100, "validation_enabled": True, "urls_checked": 5},
             {},
         )
 
-        with patch("sys.argv", ["analyze.py", "--validate"]):
-            main()
+        run_analyze("--validate")
 
         # Should load and save validation cache when validation is enabled
         mock_load_cache.assert_called_once()
         mock_save_cache.assert_called_once()
 
         # Should pass cache to analyze function
-        args, kwargs = mock_analyze.call_args
+        args, kwargs = pipeline.analyze.call_args
         # Fourth positional argument should be validation_cache
         assert args[3] == {"https://test.org": {"accessible": True}}
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    def test_main_error_handling(
-        self, mock_parse, mock_get_metadata, mock_get_federation
-    ):
+    def test_main_error_handling(self, pipeline, run_analyze):
         """Test main function error handling."""
         # Mock an exception during parsing
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.side_effect = Exception("Parse error")
-
-        with patch("sys.argv", ["analyze.py"]):
-            with pytest.raises(SystemExit):
-                main()
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    def test_main_keyboard_interrupt(
-        self, mock_parse, mock_get_metadata, mock_get_federation
-    ):
+        pipeline.iter_entities.side_effect = Exception("Parse error")
+
+        with pytest.raises(SystemExit):
+            run_analyze()
+
+    def test_main_keyboard_interrupt(self, pipeline, run_analyze, capsys):
         """Test main function handles KeyboardInterrupt gracefully."""
         # Mock KeyboardInterrupt during parsing
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.side_effect = KeyboardInterrupt()
+        pipeline.iter_entities.side_effect = KeyboardInterrupt()
 
-        with patch("sys.argv", ["analyze.py"]):
-            with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-                with pytest.raises(SystemExit) as exc_info:
-                    main()
+        with pytest.raises(SystemExit) as exc_info:
+            run_analyze()
 
-                # Should exit with code 1
-                assert exc_info.value.code == 1
-                # Should print user-friendly message
-                assert "interrupted by user" in mock_stderr.getvalue()
+        # Should exit with code 1
+        assert exc_info.value.code == 1
+        # Should print user-friendly message
+        assert "interrupted by user" in capsys.readouterr().err
 
-    def test_main_help(self):
+    def test_main_help(self, run_analyze):
         """Test main function with --help option."""
-        with patch("sys.argv", ["analyze.py", "--help"]):
-            with pytest.raises(SystemExit) as exc_info:
-                main()
-            # argparse exits with code 0 for help
-            assert exc_info.value.code == 0
-
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_validate_content_flag_parsed(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_get_federation,
-    ):
-        """sys.argv with --validate-content gives args.validate_content == True."""
-        mock_get_federation.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = (
-            [],
-            {"total_entities": 0, "content_validation_enabled": True},
-            {},
-        )
+        with pytest.raises(SystemExit) as exc_info:
+            run_analyze("--help")
+        # argparse exits with code 0 for help
+        assert exc_info.value.code == 0
 
-        from edugain_analysis.cli.main import setup_argument_parser
-
-        with patch("sys.argv", ["analyze.py", "--validate-content"]):
-            parser = setup_argument_parser()
-            args = parser.parse_args()
+    def test_validate_content_flag_parsed(self):
+        """--validate-content on the command line gives args.validate_content == True."""
+        args = setup_argument_parser().parse_args(["--validate-content"])
 
         assert args.validate_content is True
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.load_url_validation_cache")
-    @patch("edugain_analysis.cli.main.save_url_validation_cache")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("edugain_analysis.cli.main.print_summary")
-    def test_validate_content_implies_validate(
-        self,
-        mock_print_summary,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_save_cache,
-        mock_load_cache,
-        mock_get_federation,
-    ):
+    def test_validate_content_implies_validate(self, pipeline, mock_main, run_analyze):
         """--validate-content alone causes enable_validation=True passed to analyze_privacy_security."""
-        mock_get_federation.return_value = {}
-        mock_load_cache.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
-        mock_analyze.return_value = (
+        mock_main("print_summary")
+        mock_main("save_url_validation_cache")
+        mock_main("load_url_validation_cache", return_value={})
+        pipeline.analyze.return_value = (
             [],
             {
                 "total_entities": 0,
@@ -622,37 +372,18 @@ class TestCLIMain:
             {},
         )
 
-        with patch("sys.argv", ["analyze.py", "--validate-content"]):
-            main()
+        run_analyze("--validate-content")
 
-        args_call, kwargs_call = mock_analyze.call_args
+        args_call, kwargs_call = pipeline.analyze.call_args
         # Third positional arg is enable_validation
         assert args_call[2] is True
         # validate_content keyword arg must also be True
         assert kwargs_call.get("validate_content") is True
 
-    @patch("edugain_analysis.cli.main.get_federation_mapping")
-    @patch("edugain_analysis.cli.main.load_url_validation_cache")
-    @patch("edugain_analysis.cli.main.save_url_validation_cache")
-    @patch("edugain_analysis.cli.main.get_metadata")
-    @patch("edugain_analysis.cli.main.parse_metadata")
-    @patch("edugain_analysis.cli.main.analyze_privacy_security")
-    @patch("sys.stdout", new_callable=StringIO)
-    def test_csv_urls_content_analysis(
-        self,
-        mock_stdout,
-        mock_analyze,
-        mock_parse,
-        mock_get_metadata,
-        mock_save_cache,
-        mock_load_cache,
-        mock_get_federation,
-    ):
+    def test_csv_urls_content_analysis(self, pipeline, mock_main, run_analyze, capsys):
         """--csv urls-content-analysis outputs expected content-quality CSV headers."""
-        mock_get_federation.return_value = {}
-        mock_load_cache.return_value = {}
-        mock_get_metadata.return_value = b"<xml>metadata</xml>"
-        mock_parse.return_value = MagicMock()
+        mock_main("save_url_validation_cache")
+        mock_main("load_url_validation_cache", return_value={})
 
         entities_list = [
             [
@@ -685,12 +416,11 @@ class TestCLIMain:
                 }
             },
         }
-        mock_analyze.return_value = (entities_list, stats, {})
+        pipeline.analyze.return_value = (entities_list, stats, {})
 
-        with patch("sys.argv", ["analyze.py", "--csv", "urls-content-analysis"]):
-            main()
+        run_analyze("--csv", "urls-content-analysis")
 
-        output = mock_stdout.getvalue()
+        output = capsys.readouterr().out
         # Headers row must contain content-quality specific columns
         assert "ContentQualityScore" in output
         assert "IsSoft404" in output
@@ -1,30 +1,19 @@
 """Tests for cli/seccon.py functionality."""
 
-import os
-import sys
-import xml.etree.ElementTree as ET
-from io import StringIO
-from unittest.mock import MagicMock, patch
-
 import pytest
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
-
+from edugain_analysis.cli import seccon
 from edugain_analysis.cli.seccon import (
     EDUGAIN_METADATA_URL,
     REQUEST_TIMEOUT,
     analyze_entities,
-    main,
 )
 
 
 class TestAnalyzeEntities:
     """Test the analyze_entities function."""
 
-    def test_analyze_entities_with_security_no_sirtfi(self):
+    def test_analyze_entities_with_security_no_sirtfi(self, metadata_source):
         """Test analysis of entities with security contacts but no SIRTFI."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -44,8 +33,7 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 1
         assert entities[0][0] == "https://incommon.org"  # registration authority
@@ -53,7 +41,7 @@ class TestAnalyzeEntities:
         assert entities[0][2] == "Example SP"  # organization name
         assert entities[0][3] == "https://sp.example.org"  # entity ID
 
-    def test_analyze_entities_with_sirtfi_certification(self):
+    def test_analyze_entities_with_sirtfi_certification(self, metadata_source):
         """Test analysis of entities with SIRTFI certification (should be excluded)."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -80,12 +68,11 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0  # Should be excluded due to SIRTFI certification
 
-    def test_analyze_entities_incommon_security_contact(self):
+    def test_analyze_entities_incommon_security_contact(self, metadata_source):
         """Test analysis with InCommon security contact format."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -105,13 +92,12 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 1
         assert entities[0][1] == "IdP"  # entity type
 
-    def test_analyze_entities_no_security_contact(self):
+    def test_analyze_entities_no_security_contact(self, metadata_source):
         """Test analysis of entities without security contacts (should be excluded)."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -127,12 +113,11 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0  # Should be excluded - no security contact
 
-    def test_analyze_entities_missing_fields(self):
+    def test_analyze_entities_missing_fields(self, metadata_source):
         """Test analysis with missing optional fields but required registration authority."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -149,8 +134,7 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 1
         assert entities[0][0] == "https://minimal.org"  # registration authority
@@ -158,18 +142,17 @@ class TestAnalyzeEntities:
         assert entities[0][2] == "Unknown"  # organization name (default when missing)
         assert entities[0][3] == "https://sp.minimal.org"  # entity ID
 
-    def test_analyze_entities_empty_metadata(self):
+    def test_analyze_entities_empty_metadata(self, metadata_source):
         """Test analysis of empty metadata."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0
 
-    def test_analyze_entities_missing_entity_id(self):
+    def test_analyze_entities_missing_entity_id(self, metadata_source):
         """Test analysis of entities without entityID."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -186,12 +169,11 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0  # Should be excluded - no entityID
 
-    def test_analyze_entities_missing_registration_info(self):
+    def test_analyze_entities_missing_registration_info(self, metadata_source):
         """Test analysis of entities without registration info."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -204,12 +186,11 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0  # Should be excluded - no registration info
 
-    def test_analyze_entities_empty_registration_authority(self):
+    def test_analyze_entities_empty_registration_authority(self, metadata_source):
         """Test analysis of entities with empty registration authority."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -226,12 +207,11 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 0  # Should be excluded - empty registration authority
 
-    def test_analyze_entities_no_descriptor(self):
+    def test_analyze_entities_no_descriptor(self, metadata_source):
         """Test analysis of entities with neither SP nor IdP descriptor."""
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
@@ -247,57 +227,48 @@ class TestAnalyzeEntities:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
-        entities = analyze_entities(root)
+        entities = analyze_entities(metadata_source(xml_content))
 
         assert len(entities) == 1
         assert entities[0][1] is None  # entity type should be None
 
 
+@pytest.fixture
+def cli_module():
+    """The CLI module driven by the shared cli_mocks/run_main fixtures."""
+    return seccon
+
+
 class TestCSVOutput:
     """Test CSV output functionality within main function."""
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_csv_output_with_headers(self, mock_analyze, mock_load):
+    def test_csv_output_with_headers(self, cli_mocks, run_main):
         """Test CSV output with headers through main function."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [
-            ["https://incommon.org", "SP", "Example SP", "https://sp.example.org"],
-            ["https://ukfed.org.uk", "IdP", "Example IdP", "https://idp.example.org"],
+        cli_mocks.analyze.return_value = [
+            ("https://incommon.org", "SP", "Example SP", "https://sp.example.org"),
+            ("https://ukfed.org.uk", "IdP", "Example IdP", "https://idp.example.org"),
         ]
 
-        test_args = ["seccon"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-                main()
-                result = mock_stdout.getvalue()
+        result = run_main()
 
         lines = result.strip().split("\n")
         assert "RegistrationAuthority,EntityType,OrganizationName,EntityID" in lines[0]
         assert "https://incommon.org,SP,Example SP,https://sp.example.org" in result
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             None, EDUGAIN_METADATA_URL, EDUGAIN_METADATA_URL, REQUEST_TIMEOUT
         )
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_csv_output_without_headers(self, mock_analyze, mock_load):
+    def test_csv_output_without_headers(self, cli_mocks, run_main):
         """Test CSV output without headers through main function."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [
-            ["https://incommon.org", "SP", "Example SP", "https://sp.example.org"],
+        cli_mocks.analyze.return_value = [
+            ("https://incommon.org", "SP", "Example SP", "https://sp.example.org"),
         ]
 
-        test_args = ["seccon", "--no-headers"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-                main()
-                result = mock_stdout.getvalue()
+        result = run_main("--no-headers")
 
         assert "RegistrationAuthority" not in result
         assert "https://incommon.org,SP,Example SP,https://sp.example.org" in result
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             None, EDUGAIN_METADATA_URL, EDUGAIN_METADATA_URL, REQUEST_TIMEOUT
         )
 
@@ -305,82 +276,47 @@ class TestCSVOutput:
 class TestMain:
     """Test the main function."""
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_main_default_options(self, mock_analyze, mock_load):
+    def test_main_default_options(self, cli_mocks, run_main):
         """Test main function with default options."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [["reg_auth", "SP", "Org", "entity_id"]]
+        run_main()
 
-        test_args = ["seccon"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO):
-                main()
-
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             None, EDUGAIN_METADATA_URL, EDUGAIN_METADATA_URL, REQUEST_TIMEOUT
         )
-        mock_analyze.assert_called_once_with(mock_load.return_value)
+        cli_mocks.analyze.assert_called_once_with(cli_mocks.load.return_value)
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_main_local_file(self, mock_analyze, mock_load):
+    def test_main_local_file(self, cli_mocks, run_main):
         """Test main function with local file option."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [["reg_auth", "SP", "Org", "entity_id"]]
-
-        test_args = ["seccon", "--local-file", "metadata.xml"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO):
-                main()
+        run_main("--local-file", "metadata.xml")
 
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             "metadata.xml", None, EDUGAIN_METADATA_URL, REQUEST_TIMEOUT
         )
-        mock_analyze.assert_called_once_with(mock_load.return_value)
+        cli_mocks.analyze.assert_called_once_with(cli_mocks.load.return_value)
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_main_no_headers(self, mock_analyze, mock_load):
+    def test_main_no_headers(self, cli_mocks, run_main):
         """Test main function with no headers option."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [["reg_auth", "SP", "Org", "entity_id"]]
-
-        test_args = ["seccon", "--no-headers"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-                main()
-                result = mock_stdout.getvalue()
+        result = run_main("--no-headers")
 
         # Should not contain headers
         assert "RegistrationAuthority" not in result
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             None, EDUGAIN_METADATA_URL, EDUGAIN_METADATA_URL, REQUEST_TIMEOUT
         )
 
-    @patch("edugain_analysis.cli.utils.load_metadata_for_cli")
-    @patch("edugain_analysis.cli.seccon.analyze_entities")
-    def test_main_custom_url(self, mock_analyze, mock_load):
+    def test_main_custom_url(self, cli_mocks, run_main):
         """Test main function with custom URL option."""
-        mock_load.return_value = MagicMock()
-        mock_analyze.return_value = [["reg_auth", "SP", "Org", "entity_id"]]
-
-        test_args = ["seccon", "--url", "https://custom.example.org/metadata"]
-        with patch("sys.argv", test_args):
-            with patch("sys.stdout", new_callable=StringIO):
-                main()
+        run_main("--url", "https://custom.example.org/metadata")
 
-        mock_load.assert_called_once_with(
+        cli_mocks.load.assert_called_once_with(
             None,
             "https://custom.example.org/metadata",
             EDUGAIN_METADATA_URL,
             REQUEST_TIMEOUT,
         )
 
-    def test_main_help_option(self):
+    def test_main_help_option(self, run_main):
         """Test main function with help option."""
-        test_args = ["seccon", "--help"]
-        with patch("sys.argv", test_args):
-            with pytest.raises(SystemExit) as exc_info:
-                main()
-            assert exc_info.value.code == 0  # Help should exit with code 0
+        with pytest.raises(SystemExit) as exc_info:
+            run_main("--help")
+        assert exc_info.value.code == 0  # Help should exit with code 0
@@ -0,0 +1,118 @@
+"""Tests for cli/utils.py helpers."""
+
+import csv
+from io import StringIO
+from unittest.mock import patch
+
+import pytest
+
+from edugain_analysis.cli.utils import (
+    buffered_stdout,
+    load_metadata_for_cli,
+    run_csv_cli,
+)
+from edugain_analysis.config import EDUGAIN_METADATA_URL
+
+
+class TestLoadMetadataForCli:
+    """Test metadata source selection for the CSV CLIs."""
+
+    @patch("edugain_analysis.cli.utils.stream_entities")
+    @patch("edugain_analysis.cli.utils.get_metadata")
+    def test_default_feed_uses_cache(self, mock_get_metadata, mock_stream):
+        """Test that the default eduGAIN feed goes through get_metadata()."""
+        mock_get_metadata.return_value = b"<md/>"
+
+        load_metadata_for_cli(None, None, EDUGAIN_METADATA_URL, 5)
+
+        mock_get_metadata.assert_called_once_with(EDUGAIN_METADATA_URL, 5)
+        mock_stream.assert_not_called()
+
+    @patch("edugain_analysis.cli.utils.stream_entities")
+    @patch("edugain_analysis.cli.utils.get_metadata")
+    def test_custom_url_is_streamed(self, mock_get_metadata, mock_stream):
+        """Test that uncached custom URLs are streamed into the parser."""
+        entities = load_metadata_for_cli(
+            None, "https://example.org/metadata.xml", EDUGAIN_METADATA_URL, 5
+        )
+
+        assert entities is mock_stream.return_value
+        mock_stream.assert_called_once_with("https://example.org/metadata.xml", 5)
+        mock_get_metadata.assert_not_called()
+
+
+class TestBufferedStdout:
+    """Test the buffered_stdout context manager."""
+
+    def test_buffered_stdout_writes_on_exit(self, tmp_path):
+        """Test that output is held in the buffer and flushed on exit."""
+        output_file = tmp_path / "out.csv"
+
+        with open(output_file, "w", encoding="utf-8") as fake_stdout:
+            with patch("sys.stdout", fake_stdout):
+                with buffered_stdout() as output:
+                    writer = csv.writer(output)
+                    writer.writerow(["Federation", "EntityID"])
+                    writer.writerows([["Fed1", "https://sp.example.org"]] * 3)
+
+                    assert output is not fake_stdout
+                    assert output_file.read_bytes() == b""
+
+        assert output_file.read_bytes() == (
+            b"Federation,EntityID\r\n" + b"Fed1,https://sp.example.org\r\n" * 3
+        )
+
+    def test_buffered_stdout_without_fileno(self):
+        """Test that streams without a file descriptor are used as-is."""
+        fake_stdout = StringIO()
+
+        with patch("sys.stdout", fake_stdout):
+            with buffered_stdout() as output:
+                csv.writer(output).writerow(["a", "b"])
+
+        assert output is fake_stdout
+        assert fake_stdout.getvalue() == "a,b\r\n"
+
+
+class TestRunCsvCli:
+    """Test the shared CSV CLI runner."""
+
+    XML_CONTENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+    <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
+        <md:EntityDescriptor entityID="https://example.org/sp"/>
+        <md:EntityDescriptor entityID="https://example.org/idp"/>
+    </md:EntitiesDescriptor>"""
+
+    def _run(self, local_file):
+        return run_csv_cli(
+            lambda entities: [[entity.get("entityID")] for entity in entities],
+            ["EntityID"],
+            local_file=str(local_file),
+            url=None,
+            default_url="https://example.org/metadata.xml",
+            timeout=5,
+            include_headers=True,
+            error_label="test rows",
+        )
+
+    def test_run_csv_cli_streams_entities(self, tmp_path, capsys):
+        """Test that rows are built from streamed EntityDescriptors."""
+        metadata_file = tmp_path / "metadata.xml"
+        metadata_file.write_bytes(self.XML_CONTENT)
+
+        self._run(metadata_file)
+
+        assert capsys.readouterr().out == (
+            "EntityID\r\nhttps://example.org/sp\r\nhttps://example.org/idp\r\n"
+        )
+
+    def test_run_csv_cli_parse_error_exits(self, tmp_path, capsys):
+        """Test that parse errors raised while streaming exit with an error."""
+        metadata_file = tmp_path / "broken.xml"
+        metadata_file.write_bytes(b"<md:EntitiesDescriptor><unclosed>")
+
+        with pytest.raises(SystemExit) as exc_info:
+            self._run(metadata_file)
+
+        assert exc_info.value.code == 1
+        assert "Error loading metadata for test rows" in capsys.readouterr().err
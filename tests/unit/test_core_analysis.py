@@ -1,16 +1,36 @@
 """Tests for core analysis functionality."""
 
-import os
-import sys
-import xml.etree.ElementTree as ET
 from unittest.mock import patch
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
+import pytest
+from lxml import etree
 
+from edugain_analysis.core import entities as core_entities
 from edugain_analysis.core.analysis import analyze_privacy_security, filter_entities
+from edugain_analysis.core.metadata import iter_entities
+
+# Single IdP with a privacy statement; shared by several tests, each of which
+# parses it into a fresh tree.
+IDP_WITH_PRIVACY_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
+                      xmlns:mdui="urn:oasis:names:tc:SAML:metadata:ui"
+                      xmlns:mdrpi="urn:oasis:names:tc:SAML:metadata:rpi">
+    <md:EntityDescriptor entityID="https://example.org/idp">
+        <md:Extensions>
+            <mdrpi:RegistrationInfo registrationAuthority="https://example.org"/>
+        </md:Extensions>
+        <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+            <md:Extensions>
+                <mdui:UIInfo>
+                    <mdui:PrivacyStatementURL xml:lang="en">https://example.org/idp-privacy</mdui:PrivacyStatementURL>
+                </mdui:UIInfo>
+            </md:Extensions>
+        </md:IDPSSODescriptor>
+        <md:Organization>
+            <md:OrganizationDisplayName xml:lang="en">Example IdP</md:OrganizationDisplayName>
+        </md:Organization>
+    </md:EntityDescriptor>
+</md:EntitiesDescriptor>"""
 
 
 class TestAnalyzePrivacySecurity:
@@ -22,7 +42,7 @@ class TestAnalyzePrivacySecurity:
         xml_content = """<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -54,7 +74,7 @@ class TestAnalyzePrivacySecurity:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -95,7 +115,7 @@ class TestAnalyzePrivacySecurity:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -111,40 +131,56 @@ class TestAnalyzePrivacySecurity:
         assert entity[1] == "IdP"  # Entity type
         assert entity[6] == "Yes"  # Has security
 
-    def test_sp_with_both_privacy_and_security(self):
-        """Test SP with both privacy statement and security contact."""
-        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
+    @pytest.mark.parametrize(
+        ("has_privacy", "has_security", "privacy_col", "security_col", "combined_key"),
+        [
+            (True, True, "Yes", "Yes", "sps_has_both"),
+            (False, True, "No", "Yes", None),
+            (True, False, "Yes", "No", None),
+            (False, False, "No", "No", "sps_missing_both"),
+        ],
+        ids=["both", "missing_privacy", "missing_security", "missing_both"],
+    )
+    def test_sp_privacy_security_matrix(
+        self, has_privacy, has_security, privacy_col, security_col, combined_key
+    ):
+        """Test SP rows and combined stats for every privacy/security pairing."""
+        privacy = (
+            """
+                <md:Extensions>
+                    <mdui:UIInfo>
+                        <mdui:PrivacyStatementURL xml:lang="en">https://example.org/privacy</mdui:PrivacyStatementURL>
+                    </mdui:UIInfo>
+                </md:Extensions>"""
+            if has_privacy
+            else ""
+        )
+        security = (
+            """
+            <md:ContactPerson remd:contactType="http://refeds.org/metadata/contactType/security">
+                <md:EmailAddress>security@example.org</md:EmailAddress>
+            </md:ContactPerson>"""
+            if has_security
+            else ""
+        )
+        xml_content = f"""<?xml version="1.0" encoding="UTF-8"?>
         <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
                               xmlns:mdui="urn:oasis:names:tc:SAML:metadata:ui"
-                              xmlns:remd="http://refeds.org/metadata"
-                              xmlns:mdrpi="urn:oasis:names:tc:SAML:metadata:rpi">
-            <md:EntityDescriptor entityID="https://example.org/sp">
-                <md:Extensions>
-                    <mdrpi:RegistrationInfo registrationAuthority="https://example.org"/>
-                </md:Extensions>
-                <md:ContactPerson remd:contactType="http://refeds.org/metadata/contactType/security">
-                    <md:EmailAddress>security@example.org</md:EmailAddress>
-                </md:ContactPerson>
-                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
-                    <md:Extensions>
-                        <mdui:UIInfo>
-                            <mdui:PrivacyStatementURL xml:lang="en">https://example.org/privacy</mdui:PrivacyStatementURL>
-                        </mdui:UIInfo>
-                    </md:Extensions>
+                              xmlns:remd="http://refeds.org/metadata">
+            <md:EntityDescriptor entityID="https://example.org/sp">{security}
+                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">{privacy}
                 </md:SPSSODescriptor>
-                <md:Organization>
-                    <md:OrganizationDisplayName xml:lang="en">Example SP</md:OrganizationDisplayName>
-                </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
-        entities_list, stats, federation_stats = analyze_privacy_security(root)
+        entities_list, stats, _ = analyze_privacy_security(root)
 
-        assert stats["sps_has_both"] == 1
-        assert stats["sps_missing_both"] == 0
-        assert stats["sps_has_privacy"] == 1
-        assert stats["sps_has_security"] == 1
+        assert [entities_list[0][4], entities_list[0][6]] == [privacy_col, security_col]
+        assert stats["sps_has_privacy"] == int(has_privacy)
+        assert stats["sps_has_security"] == int(has_security)
+        for key in ("sps_has_both", "sps_missing_both"):
+            assert stats[key] == int(key == combined_key)
 
     def test_federation_statistics(self):
         """Test federation-level statistics are calculated correctly."""
@@ -170,7 +206,7 @@ class TestAnalyzePrivacySecurity:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -195,7 +231,7 @@ class TestAnalyzePrivacySecurity:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         federation_mapping = {"https://incommon.org": "InCommon"}
 
@@ -245,7 +281,7 @@ class TestAnalyzePrivacySecurity:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(
             root, validate_urls=True
@@ -272,7 +308,7 @@ class TestAnalyzePrivacySecurity:
                 <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -280,59 +316,93 @@ class TestAnalyzePrivacySecurity:
         assert stats["total_entities"] == 1
         assert len(entities_list) == 0  # No entityID, so not included
 
+    def test_streamed_entities_match_tree(self):
+        """Test that streamed EntityDescriptors give the same result as a tree."""
+        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
+        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
+                              xmlns:mdui="urn:oasis:names:tc:SAML:metadata:ui"
+                              xmlns:remd="http://refeds.org/metadata"
+                              xmlns:mdrpi="urn:oasis:names:tc:SAML:metadata:rpi">
+            <md:EntityDescriptor entityID="https://example.org/sp">
+                <md:Extensions>
+                    <mdrpi:RegistrationInfo registrationAuthority="https://example.org"/>
+                </md:Extensions>
+                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
+                    <md:Extensions>
+                        <mdui:UIInfo>
+                            <mdui:PrivacyStatementURL xml:lang="en">https://example.org/privacy</mdui:PrivacyStatementURL>
+                        </mdui:UIInfo>
+                    </md:Extensions>
+                </md:SPSSODescriptor>
+            </md:EntityDescriptor>
+            <md:EntityDescriptor entityID="https://example.org/idp">
+                <md:ContactPerson remd:contactType="http://refeds.org/metadata/contactType/security">
+                    <md:EmailAddress>security@example.org</md:EmailAddress>
+                </md:ContactPerson>
+                <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+            </md:EntityDescriptor>
+            <md:EntityDescriptor>
+                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+            </md:EntityDescriptor>
+        </md:EntitiesDescriptor>"""
+
+        expected = analyze_privacy_security(etree.fromstring(xml_content))
+        streamed = analyze_privacy_security(iter_entities(xml_content))
+
+        assert streamed == expected
+        assert streamed[1]["total_entities"] == 3
+
+    def test_xpath_not_recompiled_per_entity(self):
+        """Test that entity lookups reuse XPath expressions compiled at import."""
+        entity = """
+            <md:EntityDescriptor entityID="https://example.org/sp{index}">
+                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+            </md:EntityDescriptor>"""
+        xml_content = (
+            '<md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">'
+            + "".join(entity.format(index=i) for i in range(25))
+            + "</md:EntitiesDescriptor>"
+        )
+        root = etree.fromstring(xml_content.encode())
+
+        with patch.object(
+            core_entities.etree, "XPath", wraps=etree.XPath
+        ) as mock_xpath:
+            entities_list, stats, _ = analyze_privacy_security(root)
+
+        assert stats["total_entities"] == 25
+        assert len(entities_list) == 25
+        mock_xpath.assert_not_called()
+
 
 class TestFilterEntities:
     """Test the filter_entities function."""
 
-    def setup_method(self):
-        """Set up test entities list."""
-        self.entities = [
-            ["Fed1", "SP", "Org1", "entity1", "Yes", "https://url1", "Yes"],  # Has both
-            ["Fed1", "SP", "Org2", "entity2", "No", "", "Yes"],  # Missing privacy
-            [
-                "Fed1",
-                "SP",
-                "Org3",
-                "entity3",
-                "Yes",
-                "https://url3",
-                "No",
-            ],  # Missing security
-            ["Fed1", "SP", "Org4", "entity4", "No", "", "No"],  # Missing both
-            ["Fed1", "IdP", "Org5", "entity5", "No", "", "Yes"],  # IdP with security
-        ]
-
-    def test_filter_missing_privacy(self):
-        """Test filtering entities missing privacy statements."""
-        result = filter_entities(self.entities, "missing_privacy")
-
-        assert len(result) == 3  # Entities 2, 4, and 5 (IdP also has "No" for privacy)
-        entity_ids = [entity[3] for entity in result]
-        assert "entity2" in entity_ids
-        assert "entity4" in entity_ids
-        assert "entity5" in entity_ids  # IdP also filtered as expected
-
-    def test_filter_missing_security(self):
-        """Test filtering entities missing security contacts."""
-        result = filter_entities(self.entities, "missing_security")
-
-        assert len(result) == 2  # Entities 3 and 4
-        assert result[0][3] == "entity3"
-        assert result[1][3] == "entity4"
-
-    def test_filter_missing_both(self):
-        """Test filtering entities missing both privacy and security."""
-        result = filter_entities(self.entities, "missing_both")
-
-        assert len(result) == 1  # Only entity 4
-        assert result[0][3] == "entity4"
-
-    def test_filter_no_filter(self):
-        """Test with no filter applied."""
-        result = filter_entities(self.entities, "none")
-
-        assert len(result) == 5  # All entities
-        assert result == self.entities
+    ENTITIES = [
+        ["Fed1", "SP", "Org1", "entity1", "Yes", "https://url1", "Yes"],  # Has both
+        ["Fed1", "SP", "Org2", "entity2", "No", "", "Yes"],  # Missing privacy
+        # Missing security
+        ["Fed1", "SP", "Org3", "entity3", "Yes", "https://url3", "No"],
+        ["Fed1", "SP", "Org4", "entity4", "No", "", "No"],  # Missing both
+        ["Fed1", "IdP", "Org5", "entity5", "No", "", "Yes"],  # IdP with security
+    ]
+
+    @pytest.mark.parametrize(
+        ("filter_mode", "expected_ids"),
+        [
+            # IdPs are tracked for privacy too, so entity5 counts as missing it
+            ("missing_privacy", ["entity2", "entity4", "entity5"]),
+            ("missing_security", ["entity3", "entity4"]),
+            ("missing_both", ["entity4"]),
+            ("none", ["entity1", "entity2", "entity3", "entity4", "entity5"]),
+        ],
+        ids=["missing_privacy", "missing_security", "missing_both", "no_filter"],
+    )
+    def test_filter_entities(self, filter_mode, expected_ids):
+        """Test that each filter mode keeps exactly the matching rows, in order."""
+        result = filter_entities(self.ENTITIES, filter_mode)
+
+        assert [entity[3] for entity in result] == expected_ids
 
     def test_filter_empty_list(self):
         """Test filtering empty entities list."""
@@ -346,27 +416,7 @@ class TestIdPPrivacyStatements:
 
     def test_single_idp_with_privacy(self):
         """Test analysis of single IdP with privacy statement."""
-        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
-        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
-                              xmlns:mdui="urn:oasis:names:tc:SAML:metadata:ui"
-                              xmlns:mdrpi="urn:oasis:names:tc:SAML:metadata:rpi">
-            <md:EntityDescriptor entityID="https://example.org/idp">
-                <md:Extensions>
-                    <mdrpi:RegistrationInfo registrationAuthority="https://example.org"/>
-                </md:Extensions>
-                <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
-                    <md:Extensions>
-                        <mdui:UIInfo>
-                            <mdui:PrivacyStatementURL xml:lang="en">https://example.org/idp-privacy</mdui:PrivacyStatementURL>
-                        </mdui:UIInfo>
-                    </md:Extensions>
-                </md:IDPSSODescriptor>
-                <md:Organization>
-                    <md:OrganizationDisplayName xml:lang="en">Example IdP</md:OrganizationDisplayName>
-                </md:Organization>
-            </md:EntityDescriptor>
-        </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(IDP_WITH_PRIVACY_XML)
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -431,7 +481,7 @@ class TestIdPPrivacyStatements:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -478,7 +528,7 @@ class TestIdPPrivacyStatements:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -490,11 +540,10 @@ class TestIdPPrivacyStatements:
         assert stats["idps_missing_privacy"] == 0
 
         # Verify both entities show "Yes" for privacy
-        sp_entity = [e for e in entities_list if e[1] == "SP"][0]
-        idp_entity = [e for e in entities_list if e[1] == "IdP"][0]
+        by_type = {e[1]: e for e in entities_list}
 
-        assert sp_entity[4] == "Yes"  # SP has privacy
-        assert idp_entity[4] == "Yes"  # IdP has privacy
+        assert by_type["SP"][4] == "Yes"  # SP has privacy
+        assert by_type["IdP"][4] == "Yes"  # IdP has privacy
 
     def test_idp_privacy_in_federation_stats(self):
         """Test federation-level IdP privacy tracking."""
@@ -527,7 +576,7 @@ class TestIdPPrivacyStatements:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
@@ -550,27 +599,7 @@ class TestIdPPrivacyStatements:
             }
         }
 
-        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
-        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
-                              xmlns:mdui="urn:oasis:names:tc:SAML:metadata:ui"
-                              xmlns:mdrpi="urn:oasis:names:tc:SAML:metadata:rpi">
-            <md:EntityDescriptor entityID="https://example.org/idp">
-                <md:Extensions>
-                    <mdrpi:RegistrationInfo registrationAuthority="https://example.org"/>
-                </md:Extensions>
-                <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol">
-                    <md:Extensions>
-                        <mdui:UIInfo>
-                            <mdui:PrivacyStatementURL xml:lang="en">https://example.org/idp-privacy</mdui:PrivacyStatementURL>
-                        </mdui:UIInfo>
-                    </md:Extensions>
-                </md:IDPSSODescriptor>
-                <md:Organization>
-                    <md:OrganizationDisplayName xml:lang="en">Example IdP</md:OrganizationDisplayName>
-                </md:Organization>
-            </md:EntityDescriptor>
-        </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(IDP_WITH_PRIVACY_XML)
 
         entities_list, stats, federation_stats = analyze_privacy_security(
             root, validate_urls=True
@@ -619,13 +648,14 @@ class TestIdPPrivacyStatements:
                 </md:Organization>
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
 
         entities_list, stats, federation_stats = analyze_privacy_security(root)
 
         # Find both IdPs
-        idp_with_privacy = [e for e in entities_list if "With Privacy" in e[2]][0]
-        idp_without_privacy = [e for e in entities_list if "Without Privacy" in e[2]][0]
+        by_org = {e[2]: e for e in entities_list}
+        idp_with_privacy = by_org["IdP With Privacy"]
+        idp_without_privacy = by_org["IdP Without Privacy"]
 
         # Both should show Yes/No, not N/A
         assert idp_with_privacy[4] == "Yes"
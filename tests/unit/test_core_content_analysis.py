@@ -1,13 +1,5 @@
 """Tests for core content_analysis functionality."""
 
-import os
-import sys
-
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
-
 from edugain_analysis.core.content_analysis import (
     analyze_content_quality,
     calculate_quality_score,
@@ -1,16 +1,15 @@
 """Tests for core.entities module."""
 
-import os
-import sys
-import xml.etree.ElementTree as ET
-
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
+from lxml import etree
+
+from edugain_analysis.core.entities import (
+    EntityRecord,
+    has_security_contact,
+    has_sirtfi,
+    iter_entity_descriptors,
+    iter_entity_records,
 )
 
-from edugain_analysis.core.entities import EntityRecord, iter_entity_records
-
 
 class TestIterEntityRecords:
     """Tests for iter_entity_records."""
@@ -49,7 +48,7 @@ class TestIterEntityRecords:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         records = list(
             iter_entity_records(root, {"https://incommon.org": "InCommon Federation"})
         )
@@ -85,7 +84,7 @@ class TestIterEntityRecords:
             </md:EntitiesDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         records = list(iter_entity_records(root))
 
         assert len(records) == 1
@@ -106,7 +105,7 @@ class TestIterEntityRecords:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         records = list(iter_entity_records(root))
 
         assert records == []
@@ -121,7 +120,7 @@ class TestIterEntityRecords:
             </md:EntityDescriptor>
         </md:EntitiesDescriptor>"""
 
-        root = ET.fromstring(xml_content)
+        root = etree.fromstring(xml_content.encode())
         records = list(iter_entity_records(root))
 
         assert len(records) == 1
@@ -131,3 +130,24 @@ class TestIterEntityRecords:
         assert record.entity_type == "SP+IdP"
         assert record.is_sp is True
         assert record.is_idp is True
+
+    def test_iter_entity_records_prefilter(self):
+        """Entities rejected by the prefilter should be skipped."""
+        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
+        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata"
+                               xmlns:remd="http://refeds.org/metadata">
+            <md:EntityDescriptor entityID="https://secure.example.org/sp">
+                <md:ContactPerson remd:contactType="http://refeds.org/metadata/contactType/security">
+                    <md:EmailAddress>security@example.org</md:EmailAddress>
+                </md:ContactPerson>
+            </md:EntityDescriptor>
+            <md:EntityDescriptor entityID="https://plain.example.org/sp"/>
+        </md:EntitiesDescriptor>"""
+
+        root = etree.fromstring(xml_content.encode())
+        records = list(iter_entity_records(root, prefilter=has_security_contact))
+
+        assert [record.entity_id for record in records] == [
+            "https://secure.example.org/sp"
+        ]
+        assert not any(has_sirtfi(entity) for entity in iter_entity_descriptors(root))
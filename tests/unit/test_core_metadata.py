@@ -1,23 +1,21 @@
 """Tests for core metadata functionality."""
 
+import io
 import json
 import os
-import sys
-import tempfile
-import xml.etree.ElementTree as ET
-from io import StringIO
+from datetime import datetime, timedelta
 from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import MagicMock, mock_open, patch
 
 import pytest
-
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
+from lxml import etree
 
 from edugain_analysis.core.metadata import (
+    EDUGAIN_METADATA_URL,
+    REQUEST_RETRIES,
     REQUEST_TIMEOUT,
+    _get_http_session,
     download_metadata,
     fetch_federation_names,
     get_cache_dir,
@@ -25,9 +23,11 @@ from edugain_analysis.core.metadata import (
     get_federation_mapping,
     get_metadata,
     is_metadata_cache_valid,
+    iter_entities,
     load_federation_cache,
     load_json_cache,
     load_metadata_cache,
+    load_metadata_validators,
     load_text_cache,
     load_url_validation_cache,
     map_registration_authority,
@@ -37,8 +37,40 @@ from edugain_analysis.core.metadata import (
     save_metadata_cache,
     save_text_cache,
     save_url_validation_cache,
+    stream_entities,
 )
 
+# Minimal single-SP metadata document shared by the parsing tests
+SP_METADATA_XML = b"""<?xml version="1.0" encoding="UTF-8"?>
+<md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
+    <md:EntityDescriptor entityID="https://example.org/sp">
+        <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+    </md:EntityDescriptor>
+</md:EntitiesDescriptor>"""
+
+
+@pytest.fixture
+def mock_session():
+    """Stand-in for the shared session metadata and federation fetches use."""
+    session = MagicMock()
+    with patch(
+        "edugain_analysis.core.metadata._get_http_session", return_value=session
+    ):
+        yield session
+
+
+@pytest.fixture
+def metadata_response():
+    """Plain stand-in for a successful requests.Response carrying metadata."""
+    raise_for_status_calls = []
+    return SimpleNamespace(
+        status_code=200,
+        content=b"<xml>test</xml>",
+        headers={"ETag": '"v1"'},
+        raise_for_status=lambda: raise_for_status_calls.append(None),
+        raise_for_status_calls=raise_for_status_calls,
+    )
+
 
 class TestCacheUtilities:
     """Test cache utility functions."""
@@ -247,8 +279,6 @@ class TestMetadataCache:
     @patch("edugain_analysis.core.metadata.datetime")
     def test_is_metadata_cache_valid_expired(self, mock_datetime, mock_get_cache_file):
         """Test cache validity when file is expired."""
-        from datetime import datetime, timedelta
-
         mock_path = MagicMock()
         mock_path.exists.return_value = True
         mock_path.stat.return_value.st_mtime = 1000
@@ -271,41 +301,48 @@ class TestMetadataCache:
         result = is_metadata_cache_valid()
         assert result is False
 
-    @patch("requests.get")
-    def test_download_metadata_success(self, mock_get):
+    def test_download_metadata_success(self, mock_session, metadata_response):
         """Test successful metadata download."""
-        mock_response = MagicMock()
-        mock_response.content = b"<xml>test</xml>"
-        mock_get.return_value = mock_response
+        mock_session.get.return_value = metadata_response
 
         result = download_metadata("https://example.org/metadata")
         assert result == b"<xml>test</xml>"
-        mock_response.raise_for_status.assert_called_once()
+        assert len(metadata_response.raise_for_status_calls) == 1
 
-    @patch("requests.get")
-    def test_download_metadata_http_error(self, mock_get):
+    def test_download_metadata_http_error(self, mock_session):
         """Test metadata download with HTTP error."""
         import requests
 
-        mock_response = MagicMock()
-        mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError(
-            "404 Not Found"
+        def raise_for_status():
+            raise requests.exceptions.HTTPError("404 Not Found")
+
+        mock_session.get.return_value = SimpleNamespace(
+            raise_for_status=raise_for_status
         )
-        mock_get.return_value = mock_response
 
         with pytest.raises(requests.exceptions.HTTPError):
             download_metadata("https://example.org/metadata")
 
-    @patch("requests.get")
-    def test_download_metadata_connection_error(self, mock_get):
+    def test_download_metadata_connection_error(self, mock_session):
         """Test metadata download with connection error."""
         import requests
 
-        mock_get.side_effect = requests.exceptions.ConnectionError("Connection failed")
+        mock_session.get.side_effect = requests.exceptions.ConnectionError(
+            "Connection failed"
+        )
 
         with pytest.raises(requests.exceptions.ConnectionError):
             download_metadata("https://example.org/metadata")
 
+    def test_http_session_is_shared_and_retries(self):
+        """Metadata fetches reuse one session whose adapters retry transient errors."""
+        session = _get_http_session()
+        assert _get_http_session() is session
+
+        retries = session.get_adapter("https://mds.edugain.org/").max_retries
+        assert retries.total == REQUEST_RETRIES
+        assert 503 in retries.status_forcelist
+
     @patch("edugain_analysis.core.metadata.get_cache_file")
     def test_save_metadata_cache(self, mock_get_cache_file):
         """Test saving metadata to cache."""
@@ -314,7 +351,7 @@ class TestMetadataCache:
 
         with patch("builtins.open", mock_open()) as mock_file:
             save_metadata_cache(b"<xml>test</xml>")
-            mock_file.assert_called_once_with(mock_path, "wb")
+            mock_file.assert_any_call(mock_path, "wb")
 
     @patch("edugain_analysis.core.metadata.is_metadata_cache_valid")
     @patch("edugain_analysis.core.metadata.get_cache_file")
@@ -352,17 +389,59 @@ class TestMetadataCache:
         mock_save.assert_not_called()
 
     @patch("edugain_analysis.core.metadata.load_metadata_cache")
-    @patch("edugain_analysis.core.metadata.download_metadata")
+    @patch("edugain_analysis.core.metadata._download_metadata")
     @patch("edugain_analysis.core.metadata.save_metadata_cache")
-    def test_get_metadata_download_fresh(self, mock_save, mock_download, mock_load):
+    def test_get_metadata_download_fresh(
+        self, mock_save, mock_download, mock_load, tmp_path
+    ):
         """Test downloading fresh metadata."""
         mock_load.return_value = None
-        mock_download.return_value = b"<xml>fresh</xml>"
+        mock_download.return_value = (b"<xml>fresh</xml>", {"ETag": '"v2"'})
 
-        result = get_metadata()
+        # An empty cache dir: no validators, so the download is unconditional
+        with patch(
+            "edugain_analysis.core.metadata.get_cache_dir", return_value=tmp_path
+        ):
+            result = get_metadata()
         assert result == b"<xml>fresh</xml>"
-        mock_download.assert_called_once()
-        mock_save.assert_called_once_with(b"<xml>fresh</xml>")
+        mock_download.assert_called_once_with(EDUGAIN_METADATA_URL, REQUEST_TIMEOUT, {})
+        mock_save.assert_called_once_with(b"<xml>fresh</xml>", {"ETag": '"v2"'})
+
+    def test_get_metadata_revalidates_expired_cache(self, mock_session, tmp_path):
+        """An expired cache answered with 304 Not Modified is reused and refreshed."""
+        cache_file = tmp_path / "metadata.xml"
+        cache_file.write_bytes(b"<xml>cached</xml>")
+        os.utime(cache_file, (1000, 1000))
+        (tmp_path / "metadata_validators.json").write_text(
+            json.dumps({"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024"})
+        )
+        mock_session.get.return_value = SimpleNamespace(status_code=304)
+
+        with patch(
+            "edugain_analysis.core.metadata.get_cache_dir", return_value=tmp_path
+        ):
+            result = get_metadata()
+
+        assert result == b"<xml>cached</xml>"
+        headers = mock_session.get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Mon, 01 Jan 2024"
+        assert cache_file.stat().st_mtime > 1000
+
+    def test_get_metadata_saves_validators(
+        self, mock_session, tmp_path, metadata_response
+    ):
+        """A full download records its ETag for the next revalidation."""
+        mock_session.get.return_value = metadata_response
+
+        with patch(
+            "edugain_analysis.core.metadata.get_cache_dir", return_value=tmp_path
+        ):
+            result = get_metadata()
+            assert load_metadata_validators() == {"ETag": '"v1"'}
+
+        assert result == b"<xml>test</xml>"
+        assert "If-None-Match" not in mock_session.get.call_args.kwargs["headers"]
 
     @patch("edugain_analysis.core.metadata.load_metadata_cache")
     @patch("edugain_analysis.core.metadata.download_metadata")
@@ -388,34 +467,25 @@ class TestMetadataParsing:
 
     def test_parse_metadata_content(self):
         """Test parsing metadata from content."""
-        xml_content = b"""<?xml version="1.0" encoding="UTF-8"?>
-        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
-            <md:EntityDescriptor entityID="https://example.org/sp">
-                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
-            </md:EntityDescriptor>
-        </md:EntitiesDescriptor>"""
-
-        root = parse_metadata(content=xml_content)
+        root = parse_metadata(content=SP_METADATA_XML)
         assert root.tag.endswith("EntitiesDescriptor")
 
-    def test_parse_metadata_local_file(self):
+    def test_parse_metadata_local_file(self, tmp_path):
         """Test parsing metadata from local file."""
-        xml_content = """<?xml version="1.0" encoding="UTF-8"?>
-        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
-            <md:EntityDescriptor entityID="https://example.org/sp">
-                <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
-            </md:EntityDescriptor>
-        </md:EntitiesDescriptor>"""
+        metadata_file = tmp_path / "metadata.xml"
+        metadata_file.write_bytes(SP_METADATA_XML)
+
+        root = parse_metadata(local_file=str(metadata_file))
+        assert root.tag.endswith("EntitiesDescriptor")
 
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".xml", delete=False) as f:
-            f.write(xml_content)
-            temp_file = f.name
+    def test_parse_metadata_uses_lxml(self):
+        """Test that both parse paths build libxml2-backed lxml elements."""
+        root = parse_metadata(content=SP_METADATA_XML)
+        streamed = list(iter_entities(SP_METADATA_XML))
 
-        try:
-            root = parse_metadata(local_file=temp_file)
-            assert root.tag.endswith("EntitiesDescriptor")
-        finally:
-            os.unlink(temp_file)
+        assert isinstance(root, etree._Element)
+        assert streamed
+        assert all(isinstance(entity, etree._Element) for entity in streamed)
 
     def test_parse_metadata_file_not_found(self):
         """Test parsing metadata from non-existent file."""
@@ -424,15 +494,193 @@ class TestMetadataParsing:
 
     def test_parse_metadata_invalid_xml(self):
         """Test parsing invalid XML content."""
-        with pytest.raises(ET.ParseError):
+        with pytest.raises(etree.ParseError):
             parse_metadata(content=b"<invalid xml")
 
+    def test_parse_metadata_invalid_local_file(self, tmp_path):
+        """Test parsing a local file that is not well-formed XML."""
+        bad_file = tmp_path / "broken.xml"
+        bad_file.write_bytes(b"<md:EntitiesDescriptor><unclosed>")
+
+        with pytest.raises(etree.ParseError, match="local metadata file"):
+            parse_metadata(local_file=str(bad_file))
+
+    def test_parse_metadata_does_not_expand_entities(self):
+        """Test that entity declarations in the metadata are not expanded."""
+        content = b"""<!DOCTYPE r [<!ENTITY name "expanded">]>
+        <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
+            <md:EntityDescriptor entityID="https://example.org/sp">
+                <md:Organization>
+                    <md:OrganizationDisplayName>&name; &amp; co</md:OrganizationDisplayName>
+                </md:Organization>
+            </md:EntityDescriptor>
+        </md:EntitiesDescriptor>"""
+
+        root = parse_metadata(content=content)
+        streamed = next(iter_entities(content))
+
+        for element in (root, streamed):
+            serialized = etree.tostring(element, encoding="unicode")
+            assert "expanded" not in serialized
+            assert "&amp; co" in serialized
+
+    def test_parse_metadata_drops_comments(self):
+        """Test that comments and processing instructions are not kept."""
+        content = b"""<md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
+            <?generator example?>
+            <md:EntityDescriptor entityID="https://example.org/sp">
+                <md:Organization>
+                    <md:OrganizationDisplayName>Example<!-- note --> Org</md:OrganizationDisplayName>
+                </md:Organization>
+            </md:EntityDescriptor>
+        </md:EntitiesDescriptor>"""
+
+        root = parse_metadata(content=content)
+        streamed = next(iter_entities(content))
+
+        for element in (root, streamed):
+            serialized = etree.tostring(element, encoding="unicode")
+            assert "note" not in serialized
+            assert "generator" not in serialized
+            assert "Example Org" in serialized
+
     def test_parse_metadata_no_input(self):
         """Test parsing metadata with no input."""
         with pytest.raises(ValueError):
             parse_metadata()
 
 
+class TestIterEntities:
+    """Test streaming EntityDescriptor extraction."""
+
+    XML_CONTENT = b"""<?xml version="1.0" encoding="UTF-8"?>
+    <md:EntitiesDescriptor xmlns:md="urn:oasis:names:tc:SAML:2.0:metadata">
+        <md:EntityDescriptor entityID="https://example.org/sp">
+            <md:SPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+        </md:EntityDescriptor>
+        <md:EntitiesDescriptor>
+            <md:EntityDescriptor entityID="https://nested.example.org/idp">
+                <md:IDPSSODescriptor protocolSupportEnumeration="urn:oasis:names:tc:SAML:2.0:protocol"/>
+            </md:EntityDescriptor>
+        </md:EntitiesDescriptor>
+    </md:EntitiesDescriptor>"""
+
+    def test_iter_entities_content(self):
+        """Test streaming entities (including nested ones) from content."""
+        entity_ids = [e.get("entityID") for e in iter_entities(self.XML_CONTENT)]
+
+        assert entity_ids == [
+            "https://example.org/sp",
+            "https://nested.example.org/idp",
+        ]
+
+    def test_iter_entities_clears_processed_entities(self):
+        """Test that entities are released once the caller moves on."""
+        stream = iter_entities(self.XML_CONTENT)
+        first = next(stream)
+        assert len(first) == 1  # SPSSODescriptor still available
+
+        next(stream)
+        assert len(first) == 0
+        assert first.get("entityID") is None
+
+    def test_iter_entities_local_file(self, tmp_path):
+        """Test streaming entities from a local file."""
+        metadata_file = tmp_path / "metadata.xml"
+        metadata_file.write_bytes(self.XML_CONTENT)
+
+        entities = list(iter_entities(local_file=str(metadata_file)))
+
+        assert len(entities) == 2
+
+    def test_iter_entities_file_not_found(self):
+        """Test streaming from a non-existent file."""
+        with pytest.raises(FileNotFoundError):
+            list(iter_entities(local_file="/nonexistent/file.xml"))
+
+    def test_iter_entities_invalid_xml(self):
+        """Test streaming invalid XML content."""
+        with pytest.raises(etree.ParseError, match="metadata content"):
+            list(iter_entities(b"<invalid xml"))
+
+    def test_iter_entities_no_input(self):
+        """Test streaming with no input."""
+        with pytest.raises(ValueError):
+            list(iter_entities())
+
+    @staticmethod
+    def _streamed_response(body: bytes) -> MagicMock:
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.raw = io.BytesIO(body)
+        return response
+
+    def test_stream_entities_from_url(self, mock_session):
+        """Test that entities are parsed straight from the streamed response."""
+        response = self._streamed_response(self.XML_CONTENT)
+        mock_session.get.return_value = response
+
+        stream = stream_entities("https://example.org/metadata", timeout=5)
+        mock_session.get.assert_not_called()  # nothing is fetched until iteration
+
+        entity_ids = [e.get("entityID") for e in stream]
+
+        assert entity_ids == [
+            "https://example.org/sp",
+            "https://nested.example.org/idp",
+        ]
+        assert mock_session.get.call_args.kwargs["stream"] is True
+        assert mock_session.get.call_args.kwargs["timeout"] == 5
+        assert response.raw.decode_content is True
+        response.raise_for_status.assert_called_once()
+        response.__exit__.assert_called_once()
+
+    def test_stream_entities_http_error(self, mock_session):
+        """Test that HTTP errors surface when the stream is consumed."""
+        import requests
+
+        response = self._streamed_response(b"")
+        response.raise_for_status.side_effect = requests.exceptions.HTTPError(
+            "404 Not Found"
+        )
+        mock_session.get.return_value = response
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            list(stream_entities("https://example.org/metadata"))
+
+    def test_stream_entities_connection_lost(self, mock_session):
+        """Test that a body cut off mid-stream surfaces as a requests error."""
+        import requests
+        from urllib3.exceptions import ProtocolError
+
+        class TruncatedBody(io.BytesIO):
+            def read(self, size=-1):
+                chunk = super().read(200)
+                if not chunk:
+                    raise ProtocolError("Connection broken: IncompleteRead")
+                return chunk
+
+        response = self._streamed_response(b"")
+        response.raw = TruncatedBody(self.XML_CONTENT[:200])
+        mock_session.get.return_value = response
+
+        with pytest.raises(
+            requests.exceptions.ChunkedEncodingError,
+            match="https://example.org/metadata",
+        ) as excinfo:
+            list(stream_entities("https://example.org/metadata"))
+
+        # Caught by the CLIs' OSError handling like other download errors
+        assert isinstance(excinfo.value, OSError)
+
+    def test_stream_entities_invalid_xml(self, mock_session):
+        """Test that parse errors name the streamed URL."""
+        mock_session.get.return_value = self._streamed_response(b"<invalid xml")
+
+        with pytest.raises(etree.ParseError, match="https://example.org/metadata"):
+            list(stream_entities("https://example.org/metadata"))
+
+
 class TestFederationMapping:
     """Test federation mapping functions."""
 
@@ -472,8 +720,6 @@ class TestFederationMapping:
     @patch("edugain_analysis.core.metadata.datetime")
     def test_load_federation_cache_expired(self, mock_datetime, mock_get_cache_file):
         """Test loading federation cache when expired."""
-        from datetime import datetime
-
         mock_path = MagicMock()
         mock_path.exists.return_value = True
         mock_path.stat.return_value.st_mtime = 1000
@@ -492,8 +738,6 @@ class TestFederationMapping:
     @patch("edugain_analysis.core.metadata.datetime")
     def test_load_federation_cache_json_error(self, mock_datetime, mock_get_cache_file):
         """Test loading federation cache with JSON error."""
-        from datetime import datetime
-
         mock_path = MagicMock()
         mock_path.exists.return_value = True
         mock_path.stat.return_value.st_mtime = 1000
@@ -512,15 +756,15 @@ class TestFederationMapping:
                 result = load_federation_cache()
                 assert result is None
 
-    @patch("requests.get")
-    def test_fetch_federation_names_success(self, mock_get):
+    def test_fetch_federation_names_success(self, mock_session):
         """Test successful federation names fetch."""
-        mock_response = MagicMock()
-        mock_response.json.return_value = {
+        federations = {
             "incommon": {"reg_auth": "https://incommon.org", "name": "InCommon"},
             "ukfed": {"reg_auth": "https://ukfed.org.uk", "name": "UK federation"},
         }
-        mock_get.return_value = mock_response
+        mock_session.get.return_value = SimpleNamespace(
+            raise_for_status=lambda: None, json=lambda: federations
+        )
 
         result = fetch_federation_names()
         assert result == {
@@ -528,18 +772,16 @@ class TestFederationMapping:
             "https://ukfed.org.uk": "UK federation",
         }
 
-    @patch("requests.get")
-    def test_fetch_federation_names_error(self, mock_get):
+    def test_fetch_federation_names_error(self, mock_session, capsys):
         """Test federation names fetch with error."""
         import requests
 
-        mock_get.side_effect = requests.RequestException("Network error")
+        mock_session.get.side_effect = requests.RequestException("Network error")
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            result = fetch_federation_names()
+        result = fetch_federation_names()
 
         assert result == {}
-        stderr_output = mock_stderr.getvalue()
+        stderr_output = capsys.readouterr().err
         assert "Fetching federation names" in stderr_output
         assert "Failed to fetch federation names" in stderr_output
 
@@ -641,8 +883,6 @@ class TestURLValidationCache:
         self, mock_datetime, mock_get_cache_file
     ):
         """Test loading URL validation cache when expired."""
-        from datetime import datetime
-
         mock_path = MagicMock()
         mock_path.exists.return_value = True
         mock_path.stat.return_value.st_mtime = 1000
@@ -663,8 +903,6 @@ class TestURLValidationCache:
         self, mock_datetime, mock_get_cache_file
     ):
         """Test loading URL validation cache with JSON error."""
-        from datetime import datetime
-
         mock_path = MagicMock()
         mock_path.exists.return_value = True
         mock_path.stat.return_value.st_mtime = 1000
@@ -1,23 +1,67 @@
 """Tests for core validation functionality."""
 
-import os
-import sys
+import http.client
+from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
+import pytest
+import requests
+from requests.cookies import extract_cookies_to_jar
 
+from edugain_analysis.config import URL_VALIDATION_POOL_HOSTS
+from edugain_analysis.core import validation
 from edugain_analysis.core.validation import (
     _create_error_result,
     _get_url_validation_semaphore,
+    _get_validation_session,
     validate_privacy_url,
     validate_url_with_content,
+    validate_urls_content_parallel,
     validate_urls_parallel,
 )
 
 
+@pytest.fixture(autouse=True)
+def reset_hosts_without_head():
+    """Keep hosts that rejected HEAD in one test from affecting the next."""
+    validation._hosts_without_head.clear()
+    yield
+    validation._hosts_without_head.clear()
+
+
+@pytest.fixture
+def mock_session():
+    """Stand-in for the shared session validate_privacy_url() sends requests on."""
+    session = MagicMock()
+    with patch(
+        "edugain_analysis.core.validation._get_validation_session",
+        return_value=session,
+    ):
+        yield session
+
+
+def _head_response(status_code: int, url: str, redirects: int = 0) -> SimpleNamespace:
+    """Plain stand-in for the requests.Response returned by requests.head."""
+    return SimpleNamespace(
+        status_code=status_code,
+        url=url,
+        history=[None] * redirects,
+        headers={},
+        close=lambda: None,
+    )
+
+
+def _content_response(body: bytes) -> SimpleNamespace:
+    """Plain stand-in for the streamed requests.Response read for content checks."""
+    return SimpleNamespace(
+        status_code=200,
+        url="https://example.org/privacy",
+        encoding="utf-8",
+        iter_content=lambda chunk_size: iter([body]),
+        close=lambda: None,
+    )
+
+
 class TestValidatePrivacyURL:
     """Test the validate_privacy_url function."""
 
@@ -65,14 +109,11 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is True
         assert result["from_cache"] is True
 
-    @patch("requests.head")
-    def test_successful_validation(self, mock_head):
+    def test_successful_validation(self, mock_session):
         """Test successful URL validation."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy"
-        mock_response.history = []
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            200, "https://example.org/privacy"
+        )
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -84,14 +125,11 @@ class TestValidatePrivacyURL:
         assert result["redirect_count"] == 0
         assert result["error"] is None
 
-    @patch("requests.head")
-    def test_validation_with_redirects(self, mock_head):
+    def test_validation_with_redirects(self, mock_session):
         """Test URL validation with redirects."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy-final"
-        mock_response.history = [MagicMock(), MagicMock()]  # 2 redirects
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            200, "https://example.org/privacy-final", redirects=2
+        )
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -102,14 +140,11 @@ class TestValidatePrivacyURL:
         assert result["final_url"] == "https://example.org/privacy-final"
         assert result["redirect_count"] == 2
 
-    @patch("requests.head")
-    def test_validation_client_error(self, mock_head):
+    def test_validation_client_error(self, mock_session):
         """Test URL validation with client error."""
-        mock_response = MagicMock()
-        mock_response.status_code = 404
-        mock_response.url = "https://example.org/privacy"
-        mock_response.history = []
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            404, "https://example.org/privacy"
+        )
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -118,14 +153,11 @@ class TestValidatePrivacyURL:
         assert result["status_code"] == 404
         assert result["accessible"] is False
 
-    @patch("requests.head")
-    def test_validation_server_error(self, mock_head):
+    def test_validation_server_error(self, mock_session):
         """Test URL validation with server error."""
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_response.url = "https://example.org/privacy"
-        mock_response.history = []
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            500, "https://example.org/privacy"
+        )
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -134,12 +166,9 @@ class TestValidatePrivacyURL:
         assert result["status_code"] == 500
         assert result["accessible"] is False
 
-    @patch("requests.head")
-    def test_validation_timeout(self, mock_head):
+    def test_validation_timeout(self, mock_session):
         """Test URL validation timeout."""
-        import requests
-
-        mock_head.side_effect = requests.exceptions.Timeout()
+        mock_session.head.side_effect = requests.exceptions.Timeout()
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -149,12 +178,9 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "Request timeout"
 
-    @patch("requests.head")
-    def test_validation_connection_error(self, mock_head):
+    def test_validation_connection_error(self, mock_session):
         """Test URL validation connection error."""
-        import requests
-
-        mock_head.side_effect = requests.exceptions.ConnectionError()
+        mock_session.head.side_effect = requests.exceptions.ConnectionError()
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -164,12 +190,9 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "Connection error"
 
-    @patch("requests.head")
-    def test_validation_ssl_error(self, mock_head):
+    def test_validation_ssl_error(self, mock_session):
         """Test URL validation SSL error."""
-        import requests
-
-        mock_head.side_effect = requests.exceptions.SSLError()
+        mock_session.head.side_effect = requests.exceptions.SSLError()
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -179,12 +202,9 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "SSL certificate error"
 
-    @patch("requests.head")
-    def test_validation_too_many_redirects(self, mock_head):
+    def test_validation_too_many_redirects(self, mock_session):
         """Test URL validation with too many redirects."""
-        import requests
-
-        mock_head.side_effect = requests.exceptions.TooManyRedirects()
+        mock_session.head.side_effect = requests.exceptions.TooManyRedirects()
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -194,12 +214,11 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "Too many redirects"
 
-    @patch("requests.head")
-    def test_validation_request_exception(self, mock_head):
+    def test_validation_request_exception(self, mock_session):
         """Test URL validation with general request exception."""
-        import requests
-
-        mock_head.side_effect = requests.exceptions.RequestException("Custom error")
+        mock_session.head.side_effect = requests.exceptions.RequestException(
+            "Custom error"
+        )
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -209,10 +228,9 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "Request error: Custom error"
 
-    @patch("requests.head")
-    def test_validation_unexpected_exception(self, mock_head):
+    def test_validation_unexpected_exception(self, mock_session):
         """Test URL validation with unexpected exception."""
-        mock_head.side_effect = ValueError("Unexpected error")
+        mock_session.head.side_effect = ValueError("Unexpected error")
 
         result = validate_privacy_url(
             "https://example.org/privacy", use_semaphore=False
@@ -222,14 +240,11 @@ class TestValidatePrivacyURL:
         assert result["accessible"] is False
         assert result["error"] == "Unexpected error: Unexpected error"
 
-    @patch("requests.head")
-    def test_validation_adds_to_cache(self, mock_head):
+    def test_validation_adds_to_cache(self, mock_session):
         """Test that validation results are added to cache."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy"
-        mock_response.history = []
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            200, "https://example.org/privacy"
+        )
 
         cache = {}
         result = validate_privacy_url(
@@ -239,14 +254,11 @@ class TestValidatePrivacyURL:
         assert "https://example.org/privacy" in cache
         assert cache["https://example.org/privacy"]["status_code"] == 200
 
-    @patch("requests.head")
-    def test_validation_cache_not_provided(self, mock_head):
+    def test_validation_cache_not_provided(self, mock_session):
         """Test validation when cache is not provided."""
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy"
-        mock_response.history = []
-        mock_head.return_value = mock_response
+        mock_session.head.return_value = _head_response(
+            200, "https://example.org/privacy"
+        )
 
         # Test with validation_cache=None
         result = validate_privacy_url(
@@ -256,6 +268,69 @@ class TestValidatePrivacyURL:
         assert result["status_code"] == 200
         assert result["accessible"] is True
 
+    def test_validation_session_is_shared_and_pooled(self):
+        """Test that URLs are checked over one pooled keep-alive session."""
+        session = _get_validation_session()
+        assert _get_validation_session() is session
+
+        adapter = session.get_adapter("https://example.org/privacy")
+        assert adapter._pool_connections == URL_VALIDATION_POOL_HOSTS
+        assert adapter.max_retries.total == 0
+
+    def test_head_not_allowed_falls_back_to_get(self, mock_session):
+        """Test GET fallback on 405, and that the host then skips HEAD."""
+        mock_session.head.return_value = _head_response(
+            405, "https://example.org/privacy"
+        )
+        mock_session.get.side_effect = lambda url, **kwargs: _head_response(200, url)
+
+        first = validate_privacy_url("https://example.org/privacy", use_semaphore=False)
+        second = validate_privacy_url("https://example.org/other", use_semaphore=False)
+
+        assert first["accessible"] is True
+        assert second["accessible"] is True
+        assert second["final_url"] == "https://example.org/other"
+        mock_session.head.assert_called_once()
+        assert mock_session.get.call_count == 2
+
+    def test_head_not_allowed_after_redirect_marks_final_host(self, mock_session):
+        """Test that a 405 after a redirect is remembered for the final host."""
+        mock_session.head.side_effect = lambda url, **kwargs: (
+            _head_response(405, "https://cdn.example.net/privacy", redirects=1)
+            if url.startswith("https://example.org/")
+            else _head_response(200, url)
+        )
+        mock_session.get.side_effect = lambda url, **kwargs: _head_response(200, url)
+
+        validate_privacy_url("https://example.org/privacy", use_semaphore=False)
+        validate_privacy_url("https://example.org/other", use_semaphore=False)
+        validate_privacy_url("https://cdn.example.net/terms", use_semaphore=False)
+
+        assert [call.args[0] for call in mock_session.head.call_args_list] == [
+            "https://example.org/privacy",
+            "https://example.org/other",
+        ]
+        assert validation._hosts_without_head == {"cdn.example.net"}
+
+    def test_validation_session_refuses_cookies(self):
+        """Test that cookies set by one privacy page are never sent to others."""
+        session = _get_validation_session()
+        headers = http.client.HTTPMessage()
+        headers["Set-Cookie"] = "session=abc; Path=/"
+        raw_response = SimpleNamespace(_original_response=SimpleNamespace(msg=headers))
+
+        extract_cookies_to_jar(
+            session.cookies,
+            requests.Request("GET", "https://example.org/privacy").prepare(),
+            raw_response,
+        )
+        request = session.prepare_request(
+            requests.Request("GET", "https://example.org/other")
+        )
+
+        assert len(session.cookies) == 0
+        assert "Cookie" not in request.headers
+
     def test_validation_with_semaphore(self):
         """Test validation with semaphore usage."""
         from edugain_analysis.core.validation import _get_url_validation_semaphore
@@ -287,6 +362,28 @@ class TestValidateURLsParallel:
         result = validate_urls_parallel([])
         assert result == {}
 
+    @patch("edugain_analysis.core.validation.validate_privacy_url")
+    def test_hosts_without_head_reset_per_run(self, mock_validate):
+        """Test that hosts rejecting HEAD are only remembered within one run."""
+        validation._hosts_without_head.add("example.org")
+        mock_validate.return_value = {"status_code": 200, "accessible": True}
+
+        validate_urls_parallel(["https://example.org/privacy"], max_workers=1)
+
+        assert validation._hosts_without_head == set()
+
+    @patch("edugain_analysis.core.validation.validate_url_with_content")
+    def test_hosts_without_head_reset_per_content_run(self, mock_validate):
+        """Test that content runs also start without remembered HEAD failures."""
+        validation._hosts_without_head.add("example.org")
+        mock_validate.return_value = {"status_code": 200, "accessible": True}
+
+        validate_urls_content_parallel(
+            ["https://example.org/privacy"], None, max_workers=1
+        )
+
+        assert validation._hosts_without_head == set()
+
     @patch("edugain_analysis.core.validation.validate_privacy_url")
     def test_validation_with_cache_hits(self, mock_validate):
         """Test parallel validation with cache hits."""
@@ -440,7 +537,7 @@ class TestSemaphore:
 class TestValidateURLWithContent:
     """Test the validate_url_with_content function."""
 
-    def test_cache_hit_content_analyzed(self):
+    def test_cache_hit_content_analyzed(self, mock_session):
         """Cache entry with content_analyzed=True is returned immediately; no requests.get called."""
         cached_entry = {
             "status_code": 200,
@@ -466,18 +563,17 @@ class TestValidateURLWithContent:
         }
         cache = {"https://example.org/privacy": cached_entry}
 
-        with patch("requests.get") as mock_get:
-            result = validate_url_with_content(
-                "https://example.org/privacy",
-                validation_cache=cache,
-                use_semaphore=False,
-            )
+        result = validate_url_with_content(
+            "https://example.org/privacy",
+            validation_cache=cache,
+            use_semaphore=False,
+        )
 
-        mock_get.assert_not_called()
+        mock_session.get.assert_not_called()
         assert result["content_analyzed"] is True
         assert result["from_cache"] is True
 
-    def test_inaccessible_url_skips_content(self):
+    def test_inaccessible_url_skips_content(self, mock_session):
         """Base validate returning accessible=False means content_analyzed=False; no GET request."""
         with patch(
             "edugain_analysis.core.validation.validate_privacy_url"
@@ -494,18 +590,17 @@ class TestValidateURLWithContent:
                 "retry_method": None,
             }
 
-            with patch("requests.get") as mock_get:
-                result = validate_url_with_content(
-                    "https://example.org/privacy",
-                    validation_cache={},
-                    use_semaphore=False,
-                )
+            result = validate_url_with_content(
+                "https://example.org/privacy",
+                validation_cache={},
+                use_semaphore=False,
+            )
 
-        mock_get.assert_not_called()
+        mock_session.get.assert_not_called()
         assert result["content_analyzed"] is False
         assert result["content_quality_score"] is None
 
-    def test_successful_content_analysis(self):
+    def test_successful_content_analysis(self, mock_session):
         """Mock requests.get returning 200 with privacy HTML yields content_analyzed=True and a score."""
         good_html = (
             b"<html lang='en'><head><title>Privacy</title></head>"
@@ -513,12 +608,7 @@ class TestValidateURLWithContent:
             b"right to erasure data subject data protection</body></html>"
         )
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy"
-        mock_response.encoding = "utf-8"
-        # iter_content yields the full body then stops
-        mock_response.iter_content.return_value = [good_html]
+        mock_response = _content_response(good_html)
 
         with patch(
             "edugain_analysis.core.validation.validate_privacy_url"
@@ -535,12 +625,12 @@ class TestValidateURLWithContent:
                 "retry_method": None,
             }
 
-            with patch("requests.get", return_value=mock_response):
-                result = validate_url_with_content(
-                    "https://example.org/privacy",
-                    validation_cache={},
-                    use_semaphore=False,
-                )
+            mock_session.get.return_value = mock_response
+            result = validate_url_with_content(
+                "https://example.org/privacy",
+                validation_cache={},
+                use_semaphore=False,
+            )
 
         assert result["content_analyzed"] is True
         assert result["content_quality_score"] is not None
@@ -556,10 +646,8 @@ class TestValidateURLWithContent:
         assert result["content_analyzed"] is False
         assert result["accessible"] is False
 
-    def test_fetch_exception_handled(self):
+    def test_fetch_exception_handled(self, mock_session):
         """requests.get raising an exception sets content_analyzed=False and content_fetch_error."""
-        import requests
-
         with patch(
             "edugain_analysis.core.validation.validate_privacy_url"
         ) as mock_base:
@@ -575,15 +663,14 @@ class TestValidateURLWithContent:
                 "retry_method": None,
             }
 
-            with patch(
-                "requests.get",
-                side_effect=requests.exceptions.ConnectionError("Network unreachable"),
-            ):
-                result = validate_url_with_content(
-                    "https://example.org/privacy",
-                    validation_cache={},
-                    use_semaphore=False,
-                )
+            mock_session.get.side_effect = requests.exceptions.ConnectionError(
+                "Network unreachable"
+            )
+            result = validate_url_with_content(
+                "https://example.org/privacy",
+                validation_cache={},
+                use_semaphore=False,
+            )
 
         assert result["content_analyzed"] is False
         assert "content_fetch_error" in result
@@ -616,7 +703,7 @@ class TestValidateURLWithContent:
         assert result is not None
         assert result["content_analyzed"] is False
 
-    def test_cache_miss_then_writes(self):
+    def test_cache_miss_then_writes(self, mock_session):
         """Result is stored in validation_cache after a successful analysis."""
         good_html = (
             b"<html lang='en'><head><title>Privacy Policy</title></head>"
@@ -624,11 +711,7 @@ class TestValidateURLWithContent:
             b"right to erasure data subject</body></html>"
         )
 
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.url = "https://example.org/privacy"
-        mock_response.encoding = "utf-8"
-        mock_response.iter_content.return_value = [good_html]
+        mock_response = _content_response(good_html)
 
         cache: dict = {}
 
@@ -647,12 +730,12 @@ class TestValidateURLWithContent:
                 "retry_method": None,
             }
 
-            with patch("requests.get", return_value=mock_response):
-                validate_url_with_content(
-                    "https://example.org/privacy",
-                    validation_cache=cache,
-                    use_semaphore=False,
-                )
+            mock_session.get.return_value = mock_response
+            validate_url_with_content(
+                "https://example.org/privacy",
+                validation_cache=cache,
+                use_semaphore=False,
+            )
 
         assert "https://example.org/privacy" in cache
         assert cache["https://example.org/privacy"]["content_analyzed"] is True
@@ -1,14 +1,7 @@
 """Tests for formatters functionality."""
 
 import os
-import sys
 from io import StringIO
-from unittest.mock import patch
-
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
 
 from edugain_analysis.formatters.base import (
     export_federation_csv,
@@ -17,11 +10,39 @@ from edugain_analysis.formatters.base import (
     print_summary_markdown,
 )
 
+# Per-federation counters shared by the federation summary and CSV tests
+FEDERATION_COUNTS = {
+    "total_entities": 50,
+    "total_sps": 30,
+    "total_idps": 20,
+    "sps_has_privacy": 25,
+    "sps_missing_privacy": 5,
+    "idps_has_privacy": 15,
+    "idps_missing_privacy": 5,
+    "sps_has_security": 20,
+    "sps_missing_security": 10,
+    "idps_has_security": 18,
+    "idps_missing_security": 2,
+    "total_has_security": 38,
+    "total_missing_security": 12,
+    "sps_has_both": 18,
+    "sps_missing_both": 2,
+    "total_has_sirtfi": 24,
+    "sps_has_sirtfi": 13,
+    "idps_has_sirtfi": 11,
+    "total_missing_sirtfi": 26,
+    "sps_missing_sirtfi": 17,
+    "idps_missing_sirtfi": 9,
+    "urls_checked": 0,
+    "urls_accessible": 0,
+    "urls_broken": 0,
+}
+
 
 class TestPrintSummary:
     """Test the print_summary function."""
 
-    def test_print_summary_basic(self):
+    def test_print_summary_basic(self, capsys):
         """Test basic summary printing."""
         stats = {
             "total_entities": 100,
@@ -49,9 +70,8 @@ class TestPrintSummary:
         }
 
         # Capture stderr where print_summary outputs
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "eduGAIN Quality Analysis: Privacy, Security & SIRTFI Coverage" in result
         assert "Total entities analyzed: 100" in result
@@ -60,7 +80,7 @@ class TestPrintSummary:
         assert "45/60 (75.0%)" in result  # SP privacy
         assert "30/40 (75.0%)" in result  # IdP privacy
 
-    def test_print_summary_with_validation(self):
+    def test_print_summary_with_validation(self, capsys):
         """Test summary printing with URL validation enabled."""
         stats = {
             "total_entities": 50,
@@ -90,14 +110,13 @@ class TestPrintSummary:
             "urls_broken": 5,
         }
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "Privacy Statement URL Check" in result
         assert "20 links working (80.0%)" in result
 
-    def test_print_summary_edge_cases(self):
+    def test_print_summary_edge_cases(self, capsys):
         """Test summary printing with edge cases."""
         stats = {
             "total_entities": 0,
@@ -118,9 +137,8 @@ class TestPrintSummary:
             "validation_enabled": False,
         }
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "No entities found in metadata" in result
 
@@ -235,34 +253,7 @@ class TestPrintFederationSummary:
 
     def test_print_federation_summary_basic(self):
         """Test basic federation summary printing."""
-        federation_stats = {
-            "InCommon": {
-                "total_entities": 50,
-                "total_sps": 30,
-                "total_idps": 20,
-                "sps_has_privacy": 25,
-                "sps_missing_privacy": 5,
-                "idps_has_privacy": 15,
-                "idps_missing_privacy": 5,
-                "sps_has_security": 20,
-                "sps_missing_security": 10,
-                "idps_has_security": 18,
-                "idps_missing_security": 2,
-                "total_has_security": 38,
-                "total_missing_security": 12,
-                "sps_has_both": 18,
-                "sps_missing_both": 2,
-                "total_has_sirtfi": 24,
-                "sps_has_sirtfi": 13,
-                "idps_has_sirtfi": 11,
-                "total_missing_sirtfi": 26,
-                "sps_missing_sirtfi": 17,
-                "idps_missing_sirtfi": 9,
-                "urls_checked": 0,
-                "urls_accessible": 0,
-                "urls_broken": 0,
-            }
-        }
+        federation_stats = {"InCommon": FEDERATION_COUNTS}
 
         output = StringIO()
         print_federation_summary(federation_stats, output_file=output)
@@ -286,40 +277,15 @@ class TestExportFederationCSV:
 
     def test_export_federation_csv_basic(self):
         """Test basic federation CSV export."""
-        federation_stats = {
-            "InCommon": {
-                "total_entities": 50,
-                "total_sps": 30,
-                "total_idps": 20,
-                "sps_has_privacy": 25,
-                "sps_missing_privacy": 5,
-                "idps_has_privacy": 15,
-                "idps_missing_privacy": 5,
-                "sps_has_security": 20,
-                "sps_missing_security": 10,
-                "idps_has_security": 18,
-                "idps_missing_security": 2,
-                "total_has_security": 38,
-                "total_missing_security": 12,
-                "sps_has_both": 18,
-                "sps_missing_both": 2,
-                "total_has_sirtfi": 24,
-                "sps_has_sirtfi": 13,
-                "idps_has_sirtfi": 11,
-                "total_missing_sirtfi": 26,
-                "sps_missing_sirtfi": 17,
-                "idps_missing_sirtfi": 9,
-                "urls_checked": 0,
-                "urls_accessible": 0,
-                "urls_broken": 0,
-            }
-        }
+        federation_stats = {"InCommon": FEDERATION_COUNTS}
 
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            export_federation_csv(federation_stats, include_headers=True)
-            result = mock_stdout.getvalue()
+        output = StringIO()
+        export_federation_csv(
+            federation_stats, include_headers=True, output_file=output
+        )
+        result = output.getvalue()
 
-        lines = result.strip().split("\n")
+        lines = result.splitlines()
         assert len(lines) >= 2  # Header + at least 1 data row
 
         # Check that federation name appears in output
@@ -327,49 +293,24 @@ class TestExportFederationCSV:
 
     def test_export_federation_csv_no_headers(self):
         """Test federation CSV export without headers."""
-        federation_stats = {
-            "InCommon": {
-                "total_entities": 50,
-                "total_sps": 30,
-                "total_idps": 20,
-                "sps_has_privacy": 25,
-                "sps_missing_privacy": 5,
-                "idps_has_privacy": 15,
-                "idps_missing_privacy": 5,
-                "sps_has_security": 20,
-                "sps_missing_security": 10,
-                "idps_has_security": 18,
-                "idps_missing_security": 2,
-                "total_has_security": 38,
-                "total_missing_security": 12,
-                "sps_has_both": 18,
-                "sps_missing_both": 2,
-                "total_has_sirtfi": 24,
-                "sps_has_sirtfi": 13,
-                "idps_has_sirtfi": 11,
-                "total_missing_sirtfi": 26,
-                "sps_missing_sirtfi": 17,
-                "idps_missing_sirtfi": 9,
-                "urls_checked": 0,
-                "urls_accessible": 0,
-                "urls_broken": 0,
-            }
-        }
+        federation_stats = {"InCommon": FEDERATION_COUNTS}
 
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            export_federation_csv(federation_stats, include_headers=False)
-            result = mock_stdout.getvalue()
+        output = StringIO()
+        export_federation_csv(
+            federation_stats, include_headers=False, output_file=output
+        )
+        result = output.getvalue()
 
         assert "InCommon" in result
 
     def test_export_federation_csv_empty(self):
         """Test federation CSV export with empty data."""
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            export_federation_csv({}, include_headers=True)
-            result = mock_stdout.getvalue()
+        output = StringIO()
+        export_federation_csv({}, include_headers=True, output_file=output)
+        result = output.getvalue()
 
         # Should at least have headers for empty data
-        lines = result.strip().split("\n") if result.strip() else []
+        lines = result.splitlines()
         assert len(lines) >= 1 or result == ""  # Either headers or empty
 
 
@@ -403,7 +344,7 @@ class TestPrintSummaryContentQuality:
             "validation_enabled": False,
         }
 
-    def test_content_quality_summary_displayed(self):
+    def test_content_quality_summary_displayed(self, capsys):
         """Stats with content_validation_enabled=True and scores prints 'Content Quality' to stderr."""
         stats = self._base_stats()
         stats.update(
@@ -414,24 +355,22 @@ class TestPrintSummaryContentQuality:
             }
         )
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "Content Quality" in result
 
-    def test_content_quality_hidden_when_disabled(self):
+    def test_content_quality_hidden_when_disabled(self, capsys):
         """Stats with content_validation_enabled=False produces no 'Content Quality' section."""
         stats = self._base_stats()
         stats["content_validation_enabled"] = False
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "Content Quality" not in result
 
-    def test_content_quality_issues_displayed(self):
+    def test_content_quality_issues_displayed(self, capsys):
         """Stats with content_quality_issues_breakdown prints individual issue names."""
         stats = self._base_stats()
         stats.update(
@@ -447,9 +386,8 @@ class TestPrintSummaryContentQuality:
             }
         )
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         assert "non-https" in result
 
@@ -457,7 +395,7 @@ class TestPrintSummaryContentQuality:
 class TestIdPPrivacyFormatters:
     """Test IdP privacy statement display in formatters."""
 
-    def test_print_summary_includes_idp_privacy(self):
+    def test_print_summary_includes_idp_privacy(self, capsys):
         """Verify IdP privacy statistics in terminal summary."""
         stats = {
             "total_entities": 100,
@@ -484,9 +422,8 @@ class TestIdPPrivacyFormatters:
             "validation_enabled": False,
         }
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         # Verify IdP privacy is shown
         assert "IdPs:" in result
@@ -530,50 +467,25 @@ class TestIdPPrivacyFormatters:
 
     def test_export_federation_csv_has_idp_columns(self):
         """Verify IdP privacy columns in federation CSV."""
-        federation_stats = {
-            "Test Federation": {
-                "total_entities": 50,
-                "total_sps": 30,
-                "total_idps": 20,
-                "sps_has_privacy": 25,
-                "sps_missing_privacy": 5,
-                "idps_has_privacy": 15,
-                "idps_missing_privacy": 5,
-                "sps_has_security": 20,
-                "sps_missing_security": 10,
-                "idps_has_security": 18,
-                "idps_missing_security": 2,
-                "total_has_security": 38,
-                "total_missing_security": 12,
-                "sps_has_both": 18,
-                "sps_missing_both": 2,
-                "total_has_sirtfi": 24,
-                "sps_has_sirtfi": 13,
-                "idps_has_sirtfi": 11,
-                "total_missing_sirtfi": 26,
-                "sps_missing_sirtfi": 17,
-                "idps_missing_sirtfi": 9,
-                "urls_checked": 0,
-                "urls_accessible": 0,
-                "urls_broken": 0,
-            }
-        }
+        federation_stats = {"Test Federation": FEDERATION_COUNTS}
 
-        with patch("sys.stdout", new_callable=StringIO) as mock_stdout:
-            export_federation_csv(federation_stats, include_headers=True)
-            result = mock_stdout.getvalue()
+        output = StringIO()
+        export_federation_csv(
+            federation_stats, include_headers=True, output_file=output
+        )
+        result = output.getvalue()
 
         # Check headers include IdP privacy columns
         assert "IdPsWithPrivacy" in result
         assert "IdPsMissingPrivacy" in result
 
         # Check data row includes IdP privacy values
-        lines = result.strip().split("\n")
+        lines = result.splitlines()
         data_line = lines[1]  # Second line is data
         assert "15" in data_line  # IdPs with privacy
         assert "5" in data_line  # IdPs missing privacy
 
-    def test_idp_privacy_tree_structure(self):
+    def test_idp_privacy_tree_structure(self, capsys):
         """Verify tree display format for IdP privacy."""
         stats = {
             "total_entities": 100,
@@ -600,9 +512,8 @@ class TestIdPPrivacyFormatters:
             "validation_enabled": False,
         }
 
-        with patch("sys.stderr", new_callable=StringIO) as mock_stderr:
-            print_summary(stats)
-            result = mock_stderr.getvalue()
+        print_summary(stats)
+        result = capsys.readouterr().err
 
         # Verify tree structure with box-drawing characters
         assert "├─ SPs:" in result
@@ -656,7 +567,6 @@ class TestGeneratePdfReportContentQuality:
             self._base_stats(), {}, out, "Test", include_validation=False
         )
         assert result == out
-        import os
 
         assert os.path.getsize(out) > 0
 
@@ -688,7 +598,6 @@ class TestGeneratePdfReportContentQuality:
             include_content_validation=True,
         )
         assert result == out
-        import os
 
         assert os.path.getsize(out) > 0
 
@@ -707,6 +616,5 @@ class TestGeneratePdfReportContentQuality:
             include_content_validation=True,
         )
         assert result == out
-        import os
 
         assert os.path.getsize(out) > 0
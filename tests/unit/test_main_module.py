@@ -1,14 +1,7 @@
 """Tests for __main__.py module."""
 
-import os
-import sys
 from unittest.mock import patch
 
-# Add src to Python path for imports
-sys.path.insert(
-    0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "src")
-)
-
 
 class TestMainModule:
     """Test the __main__.py module."""